@@ -0,0 +1,291 @@
+"""
+Evaluación vectorizada de muchos candidatos (PV, E) × escenarios (irradiación, carga)
+con un planificador de chunks acotado por memoria.
+
+simulate_batch replica la lógica de simulate_operation sobre un conjunto de pares
+candidato-escenario a la vez (la recursión del SOC sigue siendo hora a hora, pero
+vectorizada sobre los pares). Las matrices horarias tienen forma (pares, horas), por lo
+que evaluar todo de una vez requeriría candidatos × escenarios × 8760 valores por
+arreglo. run_batch divide el trabajo en chunks que caben en el presupuesto de memoria,
+los evalúa en paralelo y va reduciendo los resultados a medida que llegan.
+"""
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from simulator import SimulationConfig
+
+
+# Arreglos (pares × horas) en el dtype elegido vivos simultáneamente en el peor momento de
+# simulate_batch: irradiación, carga, entrega BESS, generación FV (reutilizada como excedente)
+# y FV a carga (reutilizada como remanente y luego como generador). Se suma una máscara
+# booleana (1 byte por hora).
+_HOURLY_ARRAYS = 5
+_HOURLY_MASK_BYTES = 1
+# Las curvas de consumo se evalúan por bloques de horas; cada bloque crea a lo más
+# _BLOCK_TEMPS temporales float64 de (pares × _BLOCK_HOURS).
+_BLOCK_HOURS = 256
+_BLOCK_TEMPS = 4
+# Salidas (pares × años) en float64 de simulate_batch
+_YEARLY_OUTPUTS = 10
+
+
+def _lph_from_curve_array(percent, cfg):
+    """Versión vectorizada de interp_lph_from_curve (misma extrapolación sobre 100%)."""
+    xp = [0.0, 25.0, 50.0, 75.0, 100.0]
+    fp = [0.0] + [float(v) for v in cfg.DG_performance_factors]
+    percent = np.maximum(percent, 0.0)
+    lph = np.interp(percent, xp, fp)
+    over = percent > 100.0
+    if np.any(over):
+        lph = np.where(over, fp[-1] * (percent / 100.0), lph)
+    return lph
+
+
+def _fuel_liters(kwh, cfg):
+    """
+    Litros por par: suma sobre las horas con kwh > 0 de la curva del generador evaluada en
+    kwh/DG_power. Se procesa por bloques de _BLOCK_HOURS horas para no crear matrices
+    float64 del tamaño completo. Devuelve un arreglo (P,) float64.
+    """
+    P, H = kwh.shape
+    total = np.zeros(P)
+    for h0 in range(0, H, _BLOCK_HOURS):
+        block = kwh[:, h0:h0 + _BLOCK_HOURS].astype(np.float64)
+        percent = (block / cfg.DG_power) * 100.0 if cfg.DG_power > 0 else np.full(block.shape, 100.0)
+        total += np.where(block > 0.0, _lph_from_curve_array(percent, cfg), 0.0).sum(axis=1, dtype=np.float64)
+    return total
+
+
+def bytes_per_pair(hours_per_year, dtype=np.float64, n_years=0):
+    """Memoria aproximada (bytes) que ocupa un par candidato-escenario en simulate_batch."""
+    hourly = hours_per_year * (np.dtype(dtype).itemsize * _HOURLY_ARRAYS + _HOURLY_MASK_BYTES)
+    blocks = min(hours_per_year, _BLOCK_HOURS) * 8 * _BLOCK_TEMPS
+    return hourly + blocks + n_years * 8 * _YEARLY_OUTPUTS
+
+
+def scenario_copies(nprocs):
+    """Copias residentes de los escenarios: una por worker más la del proceso principal."""
+    return nprocs + 1 if nprocs > 1 else 1
+
+
+def plan_chunks(n_pairs, hours_per_year, memory_budget_bytes, nprocs=1, dtype=None, n_scenarios=0, n_years=0):
+    """
+    Decide tamaño de chunk y dtype para que nprocs chunks simultáneos, más las copias
+    residentes de los n_scenarios perfiles (irradiación y carga en cada proceso), quepan
+    en memory_budget_bytes.
+
+    dtype=None elige automáticamente: float64 si todo el lote cabe en un chunk por
+    proceso, si no float32 (las matrices horarias en float32 tienen error relativo
+    ~1e-7; el SOC y los acumulados anuales se mantienen siempre en float64).
+    Devuelve (chunk_size, dtype).
+    """
+    if n_pairs <= 0:
+        raise ValueError("No hay pares candidato-escenario para evaluar")
+    nprocs = max(1, nprocs)
+
+    def per_proc(dt):
+        resident = 2 * n_scenarios * hours_per_year * np.dtype(dt).itemsize * scenario_copies(nprocs)
+        return (memory_budget_bytes - resident) / nprocs
+
+    if dtype is None:
+        per_pair64 = bytes_per_pair(hours_per_year, np.float64, n_years)
+        dtype = np.float64 if per_pair64 * -(-n_pairs // nprocs) <= per_proc(np.float64) else np.float32
+    chunk_size = int(max(0.0, per_proc(dtype)) // bytes_per_pair(hours_per_year, dtype, n_years))
+    if chunk_size < 1:
+        raise ValueError("El presupuesto de memoria no alcanza ni para un par candidato-escenario")
+    return min(chunk_size, n_pairs), np.dtype(dtype)
+
+
+def simulate_batch(PV_kWp, E_bess_kWh, irr, load, cfg: SimulationConfig, dtype=np.float64):
+    """
+    Simula en paralelo (vectorizado) P pares.
+
+    PV_kWp, E_bess_kWh: arreglos (P,)
+    irr, load: arreglos (P, H) con el perfil horario de cada par
+    Devuelve un dict con arreglos (P, N_years) por métrica física/económica y
+    arreglos (P,) para 'capex', 'npv' y 'payback_year' (NaN si no hay payback).
+    """
+    PV = np.asarray(PV_kWp, dtype=np.float64)
+    E = np.asarray(E_bess_kWh, dtype=np.float64)
+    irr = np.asarray(irr, dtype=dtype)
+    load = np.asarray(load, dtype=dtype)
+    P, H = load.shape
+    N = cfg.N_years
+
+    # Caso solo generador: depende únicamente de la carga
+    if cfg.DG_power > 0 and np.any((load > 1e-12) & (load / cfg.DG_power * 100.0 > 100.0)):
+        raise ValueError("El tamaño del generador no es suficiente para suplir el consumo del caso solo genset.")
+    fuel_genonly = _fuel_liters(np.where(load > 1e-12, load, 0), cfg)
+    load_hours = np.count_nonzero(load > 0, axis=1)
+
+    out = {k: np.zeros((P, N)) for k in ("fuel_hybrid", "fuel_genonly", "pv_served", "bess_served",
+                                          "gen_served", "losses", "generation", "gen_hours", "soc_end",
+                                          "net_savings")}
+
+    soc = cfg.soc_min_frac * E * cfg.bess_capacity_factors[1]
+    charge_lim = E * cfg.charge_rate / cfg.charge_ef
+    discharge_lim = E * cfg.discharge_rate
+    bess_out = np.empty((P, H), dtype=dtype)
+
+    for y in range(1, N + 1):
+        j = y - 1
+        bess_factor = cfg.bess_capacity_factors[y]
+        soc_max = E * bess_factor * cfg.soc_max_frac
+        soc_min = cfg.soc_min_frac * E * bess_factor
+
+        pv_gen = (PV[:, None] * cfg.deg_pv[y]).astype(dtype) * irr
+        out["generation"][:, j] = pv_gen.sum(axis=1, dtype=np.float64)
+        pv_to_load = np.minimum(pv_gen, load)
+        out["pv_served"][:, j] = pv_to_load.sum(axis=1, dtype=np.float64)
+        # En sitio: pv_gen pasa a ser el excedente y pv_to_load la carga remanente
+        excess = np.subtract(pv_gen, pv_to_load, out=pv_gen)
+        remaining = np.subtract(load, pv_to_load, out=pv_to_load)
+        del pv_gen, pv_to_load
+
+        losses = np.zeros(P)
+        for h in range(H):
+            ex = excess[:, h].astype(np.float64)
+            charging = ex > 1e-6
+            if charging.any():
+                needed = (soc_max - soc) / cfg.charge_ef if cfg.charge_ef > 0 else 0.0
+                can_charge = np.minimum(np.minimum(ex, charge_lim), needed)
+                soc = np.where(charging, soc + can_charge * cfg.charge_ef, soc)
+                losses += np.where(charging, ex - can_charge, 0.0)
+
+            rem = remaining[:, h].astype(np.float64)
+            discharging = rem > 1e-6
+            if discharging.any():
+                available = np.maximum(0.0, soc - soc_min)
+                can_discharge = np.minimum(np.minimum(available, discharge_lim), rem / cfg.discharge_ef)
+                can_discharge = np.where(discharging, can_discharge, 0.0)
+                soc = soc - can_discharge
+                bess_out[:, h] = can_discharge * cfg.discharge_ef
+            else:
+                bess_out[:, h] = 0.0
+        del excess
+
+        gen = np.subtract(remaining, bess_out, out=remaining)
+        gen[gen <= 1e-6] = 0.0
+        del remaining
+
+        out["bess_served"][:, j] = bess_out.sum(axis=1, dtype=np.float64)
+        out["gen_served"][:, j] = gen.sum(axis=1, dtype=np.float64)
+        out["gen_hours"][:, j] = np.count_nonzero(gen > 0.0, axis=1)
+        out["fuel_hybrid"][:, j] = _fuel_liters(gen, cfg)
+        out["fuel_genonly"][:, j] = fuel_genonly
+        out["losses"][:, j] = losses
+        out["soc_end"][:, j] = soc
+        del gen
+
+        # Económico (mismo redondeo que simulate_operation)
+        price_year = cfg.diesel_price[y]
+        cost_saved = np.round(fuel_genonly * price_year, 2) - np.round(out["fuel_hybrid"][:, j] * price_year, 2)
+        GEN_opex_year = cfg.DG_opex * (load_hours - out["gen_hours"][:, j]) * cfg.cpi_factor[y]
+        PV_BESS_opex = (cfg.C_om_pv_kW_yr + cfg.C_om_bess_kWh_yr) * cfg.cpi_factor[y]
+        out["net_savings"][:, j] = (cost_saved - PV_BESS_opex + GEN_opex_year) * cfg.df_year[y]
+
+    capex = PV * cfg.C_pv_kWp + E * cfg.C_bess_kWh
+    out["capex"] = np.round(capex, 2)
+    out["npv"] = np.round(-capex + out["net_savings"].sum(axis=1), 2)
+
+    # Payback descontado (interpolado dentro del año, como en simulate_operation)
+    payback = np.full(P, np.nan)
+    cumulative = np.zeros(P)
+    for j in range(N):
+        annual = out["net_savings"][:, j]
+        prev_cum = cumulative
+        cumulative = cumulative + annual
+        hit = np.isnan(payback) & (cumulative >= capex) & (annual > 0)
+        if hit.any():
+            frac = np.clip((capex[hit] - prev_cum[hit]) / annual[hit], 0.0, 1.0)
+            payback[hit] = j + frac
+    out["payback_year"] = payback
+    return out
+
+
+# ===========================
+# Planificador de chunks
+# ===========================
+
+_WORKER_STATE = {}
+
+
+def _init_worker(PV, E, irr_scenarios, load_scenarios, cfg, dtype):
+    _WORKER_STATE.update(PV=PV, E=E, irr=irr_scenarios, load=load_scenarios, cfg=cfg, dtype=dtype)
+
+
+def _evaluate_chunk(bounds):
+    start, stop = bounds
+    st = _WORKER_STATE
+    n_scen = st["irr"].shape[0]
+    k = np.arange(start, stop)
+    cand, scen = k // n_scen, k % n_scen
+    res = simulate_batch(st["PV"][cand], st["E"][cand], st["irr"][scen], st["load"][scen], st["cfg"], dtype=st["dtype"])
+    return cand, scen, res
+
+
+def collect_rows(acc, chunk):
+    """Reductor por defecto: una fila escalar por par candidato-escenario."""
+    cand, scen, res = chunk
+    acc = [] if acc is None else acc
+    acc.append(pd.DataFrame({
+        "candidate": cand,
+        "scenario": scen,
+        "npv": res["npv"],
+        "CAPEX": res["capex"],
+        "Payback_yr": res["payback_year"],
+        "Fuel_liters_hybrid": res["fuel_hybrid"].sum(axis=1),
+        "Fuel_liters_genonly": res["fuel_genonly"].sum(axis=1),
+        "Losses": res["losses"].sum(axis=1),
+        "Horas_generador_on": res["gen_hours"].sum(axis=1),
+    }))
+    return acc
+
+
+def run_batch(PV_candidates, E_candidates, irr_scenarios, load_scenarios, cfg,
+              memory_budget_mb=1024, nprocs=4, dtype=None, reducer=collect_rows):
+    """
+    Evalúa todos los pares (candidato, escenario) respetando un presupuesto de memoria.
+
+    PV_candidates, E_candidates: arreglos (C,) con los tamaños de cada candidato
+    irr_scenarios, load_scenarios: arreglos (S, H) (o (H,) para un único escenario)
+    memory_budget_mb: memoria total para las matrices de los chunks en vuelo y las copias de
+                      los escenarios que mantiene cada proceso
+    reducer: reducer(acc, (cand_idx, scen_idx, res)) -> acc, aplicado a medida que
+             llegan los chunks (no se guardan resultados horarios).
+
+    Con el reductor por defecto devuelve un DataFrame con una fila por par.
+    """
+    PV = np.asarray(PV_candidates, dtype=float)
+    E = np.asarray(E_candidates, dtype=float)
+    if PV.shape != E.shape:
+        raise ValueError("PV_candidates y E_candidates deben tener igual longitud")
+    irr_s = np.atleast_2d(np.asarray(irr_scenarios, dtype=float))
+    load_s = np.atleast_2d(np.asarray(load_scenarios, dtype=float))
+    if irr_s.shape != load_s.shape:
+        raise ValueError("irr_scenarios y load_scenarios deben tener igual forma")
+
+    n_pairs = PV.size * irr_s.shape[0]
+    chunk_size, dtype = plan_chunks(n_pairs, irr_s.shape[1], memory_budget_mb * 1024 ** 2, nprocs, dtype,
+                                    n_scenarios=irr_s.shape[0], n_years=cfg.N_years)
+    bounds = [(s, min(s + chunk_size, n_pairs)) for s in range(0, n_pairs, chunk_size)]
+    initargs = (PV, E, irr_s.astype(dtype), load_s.astype(dtype), cfg, dtype)
+
+    acc = None
+    if nprocs > 1 and len(bounds) > 1:
+        with Pool(processes=min(nprocs, len(bounds)), initializer=_init_worker, initargs=initargs) as pool:
+            for chunk in pool.imap_unordered(_evaluate_chunk, bounds):
+                acc = reducer(acc, chunk)
+    else:
+        _init_worker(*initargs)
+        for b in bounds:
+            acc = reducer(acc, _evaluate_chunk(b))
+
+    if reducer is collect_rows:
+        df = pd.concat(acc, ignore_index=True)
+        df.insert(0, "PV_kWp", PV[df["candidate"].to_numpy()])
+        df.insert(1, "E_bess_kWh", E[df["candidate"].to_numpy()])
+        return df.sort_values(["candidate", "scenario"], ignore_index=True)
+    return acc
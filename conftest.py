@@ -0,0 +1,35 @@
+"""
+Fixtures compartidas por las pruebas: perfiles sintéticos de un año y una
+configuración corta (N_years=4) para que cada simulación tome fracciones de segundo.
+"""
+import numpy as np
+import pytest
+
+from data_loader import expand_monthly_matrix_to_annual_hourly
+from simulator import SimulationConfig
+
+
+def _perfiles(ruido):
+    h = np.arange(24)
+    forma = np.clip(np.sin((h - 6) / 12 * np.pi), 0, None)
+    irr = expand_monthly_matrix_to_annual_hourly(np.outer(forma, np.linspace(0.9, 0.6, 12)))
+    load = np.tile(8 + 6 * np.exp(-((h - 20) / 3) ** 2) + 4 * np.exp(-((h - 8) / 2) ** 2), 365)
+    if ruido:
+        # Días distintos entre sí: sin repeticiones que aprovechar entre días
+        rng = np.random.default_rng(1)
+        irr = irr * (1 + 0.3 * rng.standard_normal(irr.size)).clip(0)
+        load = load * (1 + 0.2 * rng.standard_normal(load.size)).clip(0)
+    return irr, load
+
+
+@pytest.fixture(scope="session")
+def perfiles():
+    """perfiles(ruido) -> (irr, load) horarios de 8760 valores."""
+    return _perfiles
+
+
+@pytest.fixture(scope="session")
+def cfg():
+    return SimulationConfig(N_years=4, DOD=0.9, C_pv_kWp=817309, C_bess_kWh=375000.6,
+                            bess_capacity_factors=[1, 0.9488, 0.9168, 0.8895, 0.8651],
+                            DG_performance_factors=[3.8, 4.9, 6.9, 8.8], DG_power=32, DG_opex=1100)
@@ -0,0 +1,119 @@
+"""
+Caché de despacho a nivel de día.
+
+expand_monthly_matrix_to_annual_hourly repite el mismo perfil de 24 h de irradiación
+todos los días del mes, y muchas cargas repiten su forma diaria; por eso el mismo
+día se despacha miles de veces entre días, años y candidatos variando solo el SOC
+inicial y los factores de degradación. DayCache memoiza el resultado de un día
+(SOC final y totales diarios) con clave:
+
+    (digest del perfil del día, PV, factor FV, E nominal, factor BESS, SOC inicial cuantizado, parámetros del despacho)
+
+y permite que simulate_operation avance un día por consulta.
+
+El perfil del día se identifica por un digest de sus bytes (irradiación y carga), por lo
+que la caché no guarda ningún mapa de perfiles: su tamaño queda acotado por maxsize
+aunque se reutilice entre muchos sitios o escenarios.
+
+Presupuesto de error: el SOC inicial se redondea a múltiplos de soc_quantum × E_bess_kWh
+y el día se despacha desde ese valor representativo, por lo que cada consulta introduce
+a lo más soc_quantum/2 × E_bess_kWh de error en el SOC (el despacho no amplifica
+diferencias de SOC, y saturar la batería las elimina). Con soc_quantum=0 la clave usa
+el SOC exacto y cada día se despacha con las mismas operaciones que en la simulación
+secuencial; los totales anuales solo difieren por sumar día a día, por lo que los
+resultados (redondeados a 2 decimales) coinciden. capacity_quantum cuantiza igual los factores de degradación FV/BESS
+(por defecto exactos).
+
+Uso:
+    cache = DayCache(maxsize=200_000, soc_quantum=1e-3)
+    res = simulate_operation(PV, E, irr_8760, load_8760, cfg, day_cache=cache)
+    print(cache.stats())
+"""
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from simulator import _dispatch_hours
+
+
+class DayCache:
+    def __init__(self, maxsize=200_000, soc_quantum=1e-3, capacity_quantum=0.0):
+        if soc_quantum < 0 or capacity_quantum < 0:
+            raise ValueError("soc_quantum y capacity_quantum deben ser >= 0")
+        self.maxsize = maxsize
+        self.soc_quantum = soc_quantum
+        self.capacity_quantum = capacity_quantum
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def day_ids(self, irr_annual, load_annual):
+        """Identificador por día: digest de 16 bytes de su irradiación y carga (días iguales comparten id)."""
+        irr = np.asarray(irr_annual, dtype=float)
+        load = np.asarray(load_annual, dtype=float)
+        n = len(irr)
+        if n % 365 != 0:
+            raise ValueError("DayCache requiere un número de pasos por año múltiplo de 365")
+        steps = n // 365
+        ids = []
+        for d in range(365):
+            blob = irr[d * steps:(d + 1) * steps].tobytes() + load[d * steps:(d + 1) * steps].tobytes()
+            ids.append(hashlib.blake2b(blob, digest_size=16).digest())
+        return ids
+
+    def _quantize(self, value, quantum):
+        return round(value / quantum) * quantum if quantum > 0 else value
+
+    def dispatch_year(self, PV_kWp, E_bess_kWh, irr_annual, load_annual, day_ids, soc, degpv, bess_factor, cfg, curve,
+                      capture_hours_range=None, hourly_capture=None):
+        """Mismo contrato que simulator._dispatch_hours para el año completo, día a día."""
+        steps = len(irr_annual) // len(day_ids)
+        cfg_key = (cfg.charge_ef, cfg.discharge_ef, cfg.soc_min_frac, cfg.soc_max_frac, cfg.charge_rate,
+                   cfg.discharge_rate, cfg.DG_power, tuple(cfg.DG_performance_factors))
+        degpv_q = self._quantize(degpv, self.capacity_quantum)
+        bess_factor_q = self._quantize(bess_factor, self.capacity_quantum)
+        soc_step = self.soc_quantum * E_bess_kWh
+
+        totals = [0.0] * 9
+        for d, day_id in enumerate(day_ids):
+            h0 = d * steps
+            h1 = h0 + steps
+            if capture_hours_range is not None and h0 < capture_hours_range[1] and capture_hours_range[0] < h1:
+                # El día capturado se simula exacto para registrar la traza horaria
+                soc, day = _dispatch_hours(PV_kWp, E_bess_kWh, irr_annual, load_annual, h0, h1, soc, degpv,
+                                           bess_factor, cfg, curve, capture_hours_range, hourly_capture)
+            else:
+                if soc_step > 0:
+                    k = round(soc / soc_step)
+                    soc_rep = k * soc_step
+                else:
+                    k = soc_rep = soc
+                key = (day_id, PV_kWp, degpv_q, E_bess_kWh, bess_factor_q, k, cfg_key)
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    entry = _dispatch_hours(PV_kWp, E_bess_kWh, irr_annual, load_annual, h0, h1, soc_rep, degpv_q,
+                                            bess_factor_q, cfg, curve)
+                    self._entries[key] = entry
+                    if len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                soc, day = entry
+            for i, v in enumerate(day):
+                totals[i] += v
+        totals[6] = int(totals[6])
+        totals[7] = int(totals[7])
+        return soc, tuple(totals)
@@ -0,0 +1,354 @@
+"""
+Backends de ejecución intercambiables para evaluar muchas simulaciones.
+
+Todos los backends exponen la misma interfaz:
+
+    results = executor.map(fn, tasks, chunksize=None, progress=None, retries=None)
+
+- Los resultados se devuelven en el mismo orden que tasks.
+- Las tareas se agrupan en chunks de igual forma en todos los backends.
+- Un chunk que falla (excepción o worker caído) se reintenta hasta `retries` veces. En
+  ProcessExecutor un proceso caído rompe el pool: todos los chunks pendientes de esa llamada
+  cuentan como fallidos y se reintentan en un pool nuevo.
+- progress(evaluados, total) se invoca en el proceso principal a medida que terminan chunks.
+
+Backends: SerialExecutor, ThreadExecutor, ProcessExecutor (pool de procesos
+persistente) y SocketExecutor, que reparte chunks a workers remotos por TCP
+(multiprocessing.connection). Un worker se levanta en cada máquina con:
+
+    python executors.py worker --host 0.0.0.0 --port 6000 --authkey <clave secreta>
+
+ATENCIÓN: el worker ejecuta cualquier función que reciba (los mensajes son pickle), por lo
+que quien conozca la authkey y alcance el puerto puede ejecutar código en esa máquina. La
+authkey es obligatoria (no hay valor por defecto), el worker escucha por defecto solo en
+127.0.0.1 y solo debe exponerse en redes de confianza.
+
+El código del repositorio debe estar disponible en los workers (fn se envía por
+referencia, como en multiprocessing). Para pruebas locales, start_local_workers
+levanta workers en procesos de esta misma máquina.
+"""
+import math
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from multiprocessing.connection import Client, Listener
+
+
+def _run_chunk(args):
+    idx, fn, chunk = args
+    try:
+        return idx, True, [fn(t) for t in chunk]
+    except Exception as exc:
+        return idx, False, exc
+
+
+class Executor:
+    """Base: implementa chunking, reintentos y progreso; los backends definen _run_chunks."""
+
+    workers = 1
+
+    def __init__(self, chunksize=None, retries=0):
+        self.chunksize = chunksize
+        self.retries = retries
+
+    def _run_chunks(self, fn, indexed_chunks):
+        """Itera (idx, ok, resultados_o_excepción) a medida que terminan los chunks."""
+        raise NotImplementedError
+
+    def map(self, fn, tasks, chunksize=None, progress=None, retries=None):
+        tasks = list(tasks)
+        total = len(tasks)
+        if total == 0:
+            return []
+        chunksize = chunksize or self.chunksize or max(1, math.ceil(total / (self.workers * 4)))
+        retries = self.retries if retries is None else retries
+        chunks = [tasks[i:i + chunksize] for i in range(0, total, chunksize)]
+
+        results = [None] * len(chunks)
+        attempts = [0] * len(chunks)
+        pending = list(range(len(chunks)))
+        done = 0
+        while pending:
+            failed = []
+            running = self._run_chunks(fn, [(i, chunks[i]) for i in pending])
+            try:
+                for idx, ok, value in running:
+                    if ok:
+                        results[idx] = value
+                        done += len(value)
+                        if progress is not None:
+                            progress(done, total)
+                        continue
+                    attempts[idx] += 1
+                    if attempts[idx] > retries:
+                        raise value
+                    failed.append(idx)
+            finally:
+                # Si map se interrumpe, el backend descarta el trabajo pendiente antes de la próxima llamada
+                running.close()
+            pending = failed
+        return [r for chunk in results for r in chunk]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SerialExecutor(Executor):
+    def _run_chunks(self, fn, indexed_chunks):
+        for idx, chunk in indexed_chunks:
+            yield _run_chunk((idx, fn, chunk))
+
+
+class ThreadExecutor(Executor):
+    def __init__(self, nthreads=4, chunksize=None, retries=0):
+        super().__init__(chunksize, retries)
+        self.workers = nthreads
+        self._pool = None
+
+    def _run_chunks(self, fn, indexed_chunks):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        futures = [self._pool.submit(_run_chunk, (idx, fn, chunk)) for idx, chunk in indexed_chunks]
+        for f in futures:
+            yield f.result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+class ProcessExecutor(Executor):
+    """
+    Pool de procesos persistente entre llamadas a map (el pool queda "tibio").
+    start_method: None (por defecto del sistema), "spawn", "fork" o "forkserver".
+    initializer/initargs: se ejecutan una vez en cada proceso (p. ej. para precargar perfiles).
+    Si un proceso muere (p. ej. os._exit o falta de memoria) el pool se descarta y los
+    chunks pendientes se reportan como fallidos para que map los reintente en uno nuevo.
+    """
+
+    def __init__(self, nprocs=4, chunksize=None, retries=0, start_method=None, initializer=None, initargs=()):
+        super().__init__(chunksize, retries)
+        self.workers = nprocs
+        self.start_method = start_method
+        self.initializer = initializer
+        self.initargs = initargs
+        self._pool = None
+        self._lock = threading.Lock()   # map puede llamarse desde varios hilos (p. ej. server.py)
+
+    def _run_chunks(self, fn, indexed_chunks):
+        with self._lock:
+            if self._pool is None:
+                ctx = get_context(self.start_method) if self.start_method else None
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                                 initializer=self.initializer, initargs=self.initargs)
+            pool = self._pool
+        futures = {pool.submit(_run_chunk, (idx, fn, chunk)): idx for idx, chunk in indexed_chunks}
+        try:
+            for f in as_completed(futures):
+                try:
+                    result = f.result()
+                except BrokenProcessPool as exc:
+                    # Pool roto: se descarta (la próxima llamada crea uno nuevo) y el chunk falla
+                    with self._lock:
+                        if self._pool is pool:
+                            self._pool = None
+                            pool.shutdown(wait=False)
+                    result = (futures[f], False, exc)
+                yield result
+        finally:
+            for f in futures:
+                f.cancel()
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+
+class SocketExecutor(Executor):
+    """
+    Reparte chunks entre workers remotos. addresses: lista de (host, puerto).
+    Cada worker procesa un chunk a la vez; si una conexión se cae, el worker se
+    descarta y sus chunks se reintentan en los demás.
+    """
+
+    def __init__(self, addresses, authkey, chunksize=None, retries=1, timeout=10.0):
+        super().__init__(chunksize, retries)
+        self.addresses = [tuple(a) for a in addresses]
+        if not authkey:
+            raise ValueError("SocketExecutor requiere una authkey")
+        self.authkey = authkey if isinstance(authkey, bytes) else authkey.encode("utf-8")
+        self.timeout = timeout
+        self._conns = {}
+        self._dead = set()
+        self.workers = max(1, len(self.addresses))
+
+    def _connect(self):
+        for address in self.addresses:
+            if address in self._conns or address in self._dead:
+                continue
+            deadline = time.time() + self.timeout
+            while True:
+                try:
+                    self._conns[address] = Client(address, authkey=self.authkey)
+                    break
+                except ConnectionRefusedError:
+                    if time.time() > deadline:
+                        self._dead.add(address)
+                        break
+                    time.sleep(0.1)
+        if not self._conns:
+            raise RuntimeError("No hay workers disponibles para SocketExecutor")
+        self.workers = len(self._conns)
+
+    def _run_chunks(self, fn, indexed_chunks):
+        self._connect()
+        work = queue.Queue()
+        for item in indexed_chunks:
+            work.put(item)
+        done = queue.Queue()
+
+        def serve(address, conn):
+            while True:
+                try:
+                    idx, chunk = work.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    conn.send(("run", fn, chunk))
+                    status, value = conn.recv()
+                except (EOFError, OSError) as exc:
+                    # Worker caído: se descarta y el chunk vuelve como fallido
+                    self._conns.pop(address, None)
+                    self._dead.add(address)
+                    done.put((idx, False, exc))
+                    return
+                done.put((idx, status == "ok", value))
+
+        threads = [threading.Thread(target=serve, args=(a, c), daemon=True) for a, c in list(self._conns.items())]
+        for t in threads:
+            t.start()
+        remaining = len(indexed_chunks)
+        try:
+            while remaining:
+                try:
+                    item = done.get(timeout=0.5)
+                except queue.Empty:
+                    if not any(t.is_alive() for t in threads):
+                        # Todos los workers cayeron: los chunks no atendidos fallan
+                        while not work.empty():
+                            idx, _ = work.get_nowait()
+                            remaining -= 1
+                            yield idx, False, RuntimeError("No quedan workers disponibles")
+                    continue
+                remaining -= 1
+                yield item
+        finally:
+            # Se vacía la cola y se espera el chunk en curso de cada worker, para que sus
+            # respuestas no se mezclen con las de la próxima llamada a map
+            while True:
+                try:
+                    work.get_nowait()
+                except queue.Empty:
+                    break
+            for t in threads:
+                t.join()
+
+    def close(self):
+        for conn in self._conns.values():
+            try:
+                conn.close()
+            except OSError:
+                pass
+        self._conns = {}
+
+
+def make_executor(parallel=True, nprocs=4, executor=None):
+    """Compatibilidad con los flags parallel/nprocs: devuelve (executor, propio)."""
+    if executor is not None:
+        return executor, False
+    if parallel:
+        return ProcessExecutor(nprocs), True
+    return SerialExecutor(), True
+
+
+# ===========================
+# Worker remoto
+# ===========================
+
+def serve_worker(authkey, host="127.0.0.1", port=6000):
+    """
+    Atiende conexiones de SocketExecutor una a una hasta recibir 'shutdown'.
+    Ejecuta las funciones recibidas: usar solo con una authkey secreta y en redes de confianza.
+    """
+    if not authkey:
+        raise ValueError("serve_worker requiere una authkey")
+    authkey = authkey if isinstance(authkey, bytes) else authkey.encode("utf-8")
+    with Listener((host, port), authkey=authkey) as listener:
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                continue
+            with conn:
+                while True:
+                    try:
+                        msg = conn.recv()
+                    except (EOFError, OSError):
+                        break
+                    except Exception as exc:
+                        # Mensaje que no se puede deserializar (p. ej. función inexistente en este worker)
+                        conn.send(("error", exc))
+                        continue
+                    if msg[0] == "shutdown":
+                        return
+                    _, fn, chunk = msg
+                    _, ok, value = _run_chunk((None, fn, chunk))
+                    conn.send(("ok" if ok else "error", value))
+
+
+def start_local_workers(n, authkey, base_port=6000):
+    """Levanta n workers locales (procesos independientes). Devuelve (addresses, procesos)."""
+    authkey = authkey.decode("utf-8") if isinstance(authkey, bytes) else authkey
+    procs = []
+    addresses = []
+    for i in range(n):
+        port = base_port + i
+        procs.append(subprocess.Popen([sys.executable, __file__, "worker", "--host", "127.0.0.1",
+                                       "--port", str(port), "--authkey", authkey]))
+        addresses.append(("127.0.0.1", port))
+    return addresses, procs
+
+
+def stop_local_workers(procs):
+    for p in procs:
+        p.terminate()
+    for p in procs:
+        p.wait()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Worker remoto para SocketExecutor")
+    parser.add_argument("mode", choices=["worker"])
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="interfaz de escucha (0.0.0.0 expone el worker a la red)")
+    parser.add_argument("--port", type=int, default=6000)
+    parser.add_argument("--authkey", required=True,
+                        help="clave compartida con SocketExecutor; el worker ejecuta código recibido")
+    args = parser.parse_args()
+    serve_worker(args.authkey, args.host, args.port)
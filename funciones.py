@@ -1,7 +1,7 @@
 import pandas as pd
 import numpy as np
 
-def print_results(title, results):
+def print_results(title, results, path=None, **ids):
     print(f"\n--- {title} ---")
     print(f"NPV: {results['npv']:.2f}")
     pb = results.get('payback_year')
@@ -32,13 +32,16 @@ def print_results(title, results):
     print("\nResultados por año:")
     print(df)
 
-    # ✅ Guardar en Excel opcional
-    # df.to_excel("resultados.xlsx")
+    # ✅ Guardar en Excel (.xlsx) o Parquet (directorio) opcional; ids: columnas identificadoras (p. ej. PV_kWp=150)
+    if path is not None:
+        from reportes import abrir_reporte, exportar_resultado
+        with abrir_reporte(path) as writer:
+            exportar_resultado(writer, results, **ids)
 
     return df
 
 
-def print_results_reducidos(title, best):
+def print_results_reducidos(title, best, path=None):
     if best is None:
         print(f"\n--- {title} ---")
         print("No se encontró una solución factible.")
@@ -81,8 +84,11 @@ def print_results_reducidos(title, best):
     print("\nResultados por año:")
     print(df)
 
-    # Guardar a Excel
-    # df.to_excel("resultados_optimizador.xlsx")
+    # Guardar a Excel (.xlsx) o Parquet (directorio) opcional
+    if path is not None:
+        from reportes import abrir_reporte, exportar_resultado
+        with abrir_reporte(path) as writer:
+            exportar_resultado(writer, best, PV_kWp=best['PV_kWp'], E_bess_kWh=best['E_bess_kWh'])
 
     return df
 
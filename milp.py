@@ -1,17 +1,25 @@
 from pulp import LpProblem, LpVariable, LpMaximize, lpSum
 from simulator import simulate_operation, SimulationConfig
+from optimizer import evaluate_grid_point
+from executors import make_executor
 
-def milp_optimize(irr_annual, load_annual, cfg, PV_options, E_options):
+def milp_optimize(irr_annual, load_annual, cfg, PV_options, E_options, progress=None,
+                  parallel=False, nprocs=4, executor=None):
     """
     Optimización lineal: selecciona exactamente una combinación (PV, E) que maximiza el NPV
     precomputado por simulate_operation sobre el horizonte de cfg.N_years.
+    progress: callback opcional progress(evaluados, total) durante el precómputo.
+    parallel/nprocs/executor: backend del precómputo (ver executors.py), igual que en grid_search_optimize.
     """
     # Precomputar NPV como constantes (parámetros del modelo)
-    npv_map = {}
-    for pv in PV_options:
-        for eb in E_options:
-            res = simulate_operation(pv, eb, irr_annual, load_annual, cfg)
-            npv_map[(pv, eb)] = res['npv']
+    executor, own_executor = make_executor(parallel, nprocs, executor)
+    tasks = [(pv, eb, irr_annual, load_annual, cfg) for pv in PV_options for eb in E_options]
+    try:
+        rows = executor.map(evaluate_grid_point, tasks, progress=progress)
+    finally:
+        if own_executor:
+            executor.close()
+    npv_map = {(t[0], t[1]): r[2] for t, r in zip(tasks, rows)}
 
     # Modelo MILP
     prob = LpProblem("PV_BESS_Optimization", LpMaximize)
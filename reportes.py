@@ -0,0 +1,302 @@
+"""
+Exportación de resultados a Excel (.xlsx) y Parquet en streaming.
+
+Las métricas por año (diccionarios {año: valor} en los resultados de simulate_operation
+y en las columnas de df_grid) se aplanan a tablas en formato largo:
+
+  - "resumen": una fila por candidato (NPV, CAPEX, payback, factibilidad)
+  - "anual":   una fila por candidato y año con todas las métricas anuales
+
+Las filas se escriben a medida que se generan, con memoria acotada:
+  - Excel: xlsxwriter con constant_memory si está instalado, si no openpyxl en modo
+    write_only (las hojas se dividen al llegar al límite de filas). Excel escribe del orden
+    de 15 mil filas por segundo (la mitad con openpyxl); para barridos grandes conviene Parquet.
+  - Parquet: pyarrow.parquet.ParquetWriter por tabla, en lotes (pyarrow es opcional)
+
+Sirve para una simulación, un barrido completo (df_grid) o un portafolio de sitios:
+
+    with abrir_reporte("resultados.xlsx") as w:
+        exportar_grid(w, df_grid, sitio="Sitio A")
+"""
+import math
+import os
+
+import numpy as np
+
+
+# Columnas anuales: nombre en el reporte -> claves posibles en resultados / df_grid
+METRICAS_ANUALES = {
+    "generacion_fv": ("generación",),
+    "consumo_desde_pv": ("consumo_desde_pv",),
+    "consumo_desde_bess": ("consumo_desde_bess",),
+    "consumo_desde_genset": ("consumo_desde_genset",),
+    "perdidas_fv": ("losses_by_year", "Losses_by_year"),
+    "soc_final": ("soc_end_by_year", "SOC_end_by_year"),
+    "horas_generador_on": ("horas_generador_on",),
+    "fuel_lt_hibrido": ("fuel_hybrid_by_year", "Fuel_liters_hybrid_by_year"),
+    "fuel_lt_solo_genset": ("fuel_genonly_by_year", "Fuel_liters_genonly_by_year"),
+    "costo_fuel_hibrido": ("fuel_cost_hybrid", "Fuel_cost_hybrid"),
+    "costo_fuel_solo_genset": ("fuel_cost_genonly", "Fuel_cost_genonly"),
+    "ahorro_fuel": ("fuel_savings_cost",),
+    "gross_savings": ("gross_savings",),
+}
+OPEX_KEYS = ("assets_opex_by_year", "Assets_OPEX_by_year")
+COLUMNAS_ANUALES = ["año"] + list(METRICAS_ANUALES) + ["opex_pv_bess", "opex_gen"]
+
+# Columnas del resumen: nombre en el reporte -> claves posibles
+METRICAS_RESUMEN = {
+    "npv": ("npv",),
+    "capex": ("capex", "CAPEX"),
+    "payback_year": ("payback_year", "Payback_yr"),
+    "feasible": ("feasible", "Feasible"),
+}
+
+EXCEL_MAX_ROWS = 1_048_576
+
+# Tipos Parquet de las columnas conocidas; las demás columnas identificadoras son texto
+# salvo que se indique otro tipo en id_types
+TIPOS_PARQUET = dict({c: "float64" for c in list(METRICAS_ANUALES) + list(METRICAS_RESUMEN)},
+                     año="int64", horas_generador_on="int64", feasible="bool",
+                     opex_pv_bess="float64", opex_gen="float64", PV_kWp="float64", E_bess_kWh="float64")
+
+
+def _get(record, keys, default=None):
+    for k in keys:
+        if k in record:
+            return record[k]
+    return default
+
+
+def _native(v):
+    if v is None:
+        return None
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float) and math.isnan(v):
+        return None
+    return v
+
+
+def _check_columns(known, table, columns):
+    """Registra las columnas de cada tabla y exige que las escrituras siguientes usen las mismas."""
+    columns = list(columns)
+    previous = known.setdefault(table, columns)
+    if previous != columns:
+        raise ValueError(f"La tabla '{table}' ya tiene las columnas {previous}; se recibieron {columns}. "
+                         "Usa las mismas columnas identificadoras en todas las exportaciones de un reporte.")
+
+
+def filas_resumen(record, ids):
+    """Fila del resumen para un resultado (dict) con las columnas identificadoras ids."""
+    return list(ids.values()) + [_native(_get(record, keys)) for keys in METRICAS_RESUMEN.values()]
+
+
+def filas_anuales(record, ids):
+    """Genera una fila por año con todas las métricas anuales del resultado."""
+    series = [_get(record, keys) or {} for keys in METRICAS_ANUALES.values()]
+    opex = _get(record, OPEX_KEYS) or {}
+    years = sorted(set().union(*(s.keys() for s in series), opex.keys()))
+    prefix = list(ids.values())
+    for y in years:
+        o = opex.get(y) or {}
+        yield prefix + [y] + [_native(s.get(y)) for s in series] + [_native(o.get("pv_bess")), _native(o.get("gen"))]
+
+
+# ===========================
+# Escritores en streaming
+# ===========================
+
+class ExcelStreamWriter:
+    """
+    Escritor .xlsx de memoria constante. engine: "xlsxwriter" (constant_memory, ~2x más
+    rápido), "openpyxl" (write_only) o None para usar xlsxwriter si está instalado.
+    """
+
+    def __init__(self, path, max_rows=EXCEL_MAX_ROWS, engine=None):
+        if engine is None:
+            try:
+                import xlsxwriter  # noqa: F401
+                engine = "xlsxwriter"
+            except ImportError:
+                engine = "openpyxl"
+        self.path = path
+        self.max_rows = max_rows
+        self.engine = engine
+        if engine == "xlsxwriter":
+            import xlsxwriter
+            self._wb = xlsxwriter.Workbook(path, {"constant_memory": True})
+        elif engine == "openpyxl":
+            from openpyxl import Workbook
+            self._wb = Workbook(write_only=True)
+        else:
+            raise ValueError(f"engine desconocido: {engine}")
+        self._sheets = {}   # tabla -> [hoja, columnas, filas escritas, número de parte]
+        self._columns = {}  # tabla -> columnas
+
+    def _new_sheet(self, table, columns, part):
+        name = table if part == 1 else f"{table}_{part}"
+        if self.engine == "xlsxwriter":
+            ws = self._wb.add_worksheet(name)
+            ws.write_row(0, 0, columns)
+        else:
+            ws = self._wb.create_sheet(name)
+            ws.append(columns)
+        return [ws, columns, 1, part]
+
+    def write(self, table, columns, rows):
+        _check_columns(self._columns, table, columns)
+        state = self._sheets.get(table)
+        if state is None:
+            state = self._sheets[table] = self._new_sheet(table, columns, 1)
+        xlsx = self.engine == "xlsxwriter"
+        for row in rows:
+            if state[2] >= self.max_rows:
+                state = self._sheets[table] = self._new_sheet(table, columns, state[3] + 1)
+            if xlsx:
+                state[0].write_row(state[2], 0, row)
+            else:
+                state[0].append(row)
+            state[2] += 1
+
+    def close(self):
+        if self._wb is not None:
+            if self.engine == "xlsxwriter":
+                self._wb.close()
+            else:
+                self._wb.save(self.path)
+            self._wb = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetStreamWriter:
+    """
+    Escritor Parquet por lotes: un archivo <directorio>/<tabla>.parquet por tabla.
+    Las métricas tienen tipos fijos (TIPOS_PARQUET); las columnas identificadoras (sitio,
+    caso, ...) se guardan como texto salvo que id_types indique otro tipo, p. ej.
+    id_types={"escenario": "int64"}.
+    """
+
+    def __init__(self, directory, batch_rows=50_000, id_types=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("La exportación a Parquet requiere pyarrow (pip install pyarrow)") from exc
+        self._pa = pa
+        self._pq = pq
+        self.directory = directory
+        self.batch_rows = batch_rows
+        self.id_types = dict(id_types or {})
+        os.makedirs(directory, exist_ok=True)
+        self._tables = {}   # tabla -> [ParquetWriter, esquema, columnas, buffer]
+        self._columns = {}  # tabla -> columnas
+
+    def _schema(self, columns):
+        pa = self._pa
+        types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_()}
+        fields = []
+        for c in columns:
+            name = self.id_types.get(c) or TIPOS_PARQUET.get(c, "string")
+            if name not in types:
+                raise ValueError(f"Tipo Parquet no soportado para '{c}': {name}")
+            fields.append(pa.field(c, types[name]))
+        return pa.schema(fields)
+
+    def _flush(self, table):
+        writer, schema, columns, buffer = self._tables[table]
+        if not buffer:
+            return
+        arrays = []
+        for col, f in zip(zip(*buffer), schema):
+            if f.type == self._pa.string():
+                col = [None if v is None else str(v) for v in col]
+            arrays.append(self._pa.array(col, type=f.type))
+        writer.write_table(self._pa.Table.from_arrays(arrays, schema=schema))
+        buffer.clear()
+
+    def write(self, table, columns, rows):
+        _check_columns(self._columns, table, columns)
+        state = self._tables.get(table)
+        for row in rows:
+            if state is None:
+                schema = self._schema(columns)
+                writer = self._pq.ParquetWriter(os.path.join(self.directory, f"{table}.parquet"), schema)
+                state = self._tables[table] = [writer, schema, columns, []]
+            buffer = state[3]
+            buffer.append(row)
+            if len(buffer) >= self.batch_rows:
+                self._flush(table)
+
+    def close(self):
+        for table, state in self._tables.items():
+            self._flush(table)
+            state[0].close()
+        self._tables = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def abrir_reporte(path, **kwargs):
+    """Escritor según la ruta: *.xlsx -> Excel; cualquier otra (directorio) -> Parquet."""
+    if str(path).lower().endswith(".xlsx"):
+        return ExcelStreamWriter(path, **kwargs)
+    return ParquetStreamWriter(path, **kwargs)
+
+
+# ===========================
+# Exportadores
+# ===========================
+
+def exportar_resultado(writer, results, **ids):
+    """Exporta un resultado de simulate_operation (o el 'best' de grid_search_optimize).
+    ids: columnas identificadoras, p. ej. sitio="A", PV_kWp=150, E_bess_kWh=456."""
+    ids = {k: _native(v) for k, v in ids.items()}
+    id_cols = list(ids)
+    writer.write("resumen", id_cols + list(METRICAS_RESUMEN), [filas_resumen(results, ids)])
+    writer.write("anual", id_cols + COLUMNAS_ANUALES, filas_anuales(results, ids))
+
+
+def exportar_grid(writer, df_grid, **ids):
+    """Exporta todas las evaluaciones de un df_grid (una fila de resumen y N_years filas anuales por candidato)."""
+    id_cols = list(ids) + ["PV_kWp", "E_bess_kWh"]
+    columns = list(df_grid.columns)
+
+    def records():
+        # Una fila a la vez (sin materializar todo df_grid como lista de dicts)
+        for values in df_grid.itertuples(index=False, name=None):
+            yield dict(zip(columns, values))
+
+    def resumen():
+        for rec in records():
+            row_ids = dict(ids, PV_kWp=rec["PV_kWp"], E_bess_kWh=rec["E_bess_kWh"])
+            yield filas_resumen(rec, {k: _native(v) for k, v in row_ids.items()})
+
+    def anual():
+        for rec in records():
+            row_ids = dict(ids, PV_kWp=rec["PV_kWp"], E_bess_kWh=rec["E_bess_kWh"])
+            yield from filas_anuales(rec, {k: _native(v) for k, v in row_ids.items()})
+
+    writer.write("resumen", id_cols + list(METRICAS_RESUMEN), resumen())
+    writer.write("anual", id_cols + COLUMNAS_ANUALES, anual())
+
+
+def exportar_portafolio(writer, sitios):
+    """
+    sitios: {nombre: df_grid} o {nombre: resultado}. Agrega la columna 'sitio'; para resultados
+    individuales PV_kWp/E_bess_kWh se toman del dict si existen (p. ej. 'best' del grid search).
+    """
+    for nombre, data in sitios.items():
+        if hasattr(data, "to_dict"):
+            exportar_grid(writer, data, sitio=nombre)
+        else:
+            exportar_resultado(writer, data, sitio=nombre,
+                               PV_kWp=data.get("PV_kWp"), E_bess_kWh=data.get("E_bess_kWh"))
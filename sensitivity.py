@@ -0,0 +1,161 @@
+"""
+Sensibilidad técnica del NPV óptimo frente a parámetros de SimulationConfig (tornado / spider).
+
+Para cada parámetro barrido, los valores se recorren desde el valor base hacia afuera
+(hacia abajo y hacia arriba). Cada re-optimización parte del óptimo del valor anterior
+y usa una búsqueda local por patrones en (PV, E) en vez de una malla completa, ya que
+el óptimo se desplaza poco entre valores vecinos. Cada cadena (parámetro, dirección)
+es una tarea independiente y se ejecuta en paralelo con los backends de executors.py.
+
+Parámetros soportados: cualquier argumento del constructor de SimulationConfig
+(DOD, ef_charge, ef_discharge, charge_rate, discharge_rate, pv_deg_rate, ...) y
+"DG_curve_scale", que multiplica la curva de consumo del generador
+(DG_performance_factors).
+
+Uso:
+    spider, tornado = sensitivity_analysis(
+        irr_8760, load_8760, cfg,
+        sweeps={"DOD": [0.7, 0.8, 0.9, 1.0], "pv_deg_rate": [0.003, 0.0045, 0.007]},
+        PV_range=(50, 250), E_range=(0, 500))
+"""
+import numpy as np
+import pandas as pd
+
+from simulator import simulate_operation
+from optimizer import grid_search_optimize
+from executors import make_executor
+
+
+CURVE_SCALE = "DG_curve_scale"
+
+
+def _base_value(cfg, field):
+    if field == CURVE_SCALE:
+        return 1.0
+    if field not in cfg.params:
+        raise ValueError(f"Parámetro desconocido para la sensibilidad: {field}")
+    return cfg.params[field]
+
+
+def _variant(cfg, field, value):
+    if field == CURVE_SCALE:
+        return cfg.replace(DG_performance_factors=[f * value for f in cfg.params["DG_performance_factors"]])
+    return cfg.replace(**{field: value})
+
+
+def local_search(irr_annual, load_annual, cfg, PV0, E0, PV_range, E_range, step_PV, step_E,
+                 min_step_PV=None, min_step_E=None, max_evals=60, anchor_years=None):
+    """
+    Búsqueda por patrones del máximo NPV partiendo de (PV0, E0): evalúa los 8 vecinos a
+    distancia (step_PV, step_E), se mueve al mejor si mejora y si no reduce el paso a la mitad.
+    Devuelve (PV, E, npv, evaluaciones).
+    """
+    min_step_PV = step_PV / 4 if min_step_PV is None else min_step_PV
+    min_step_E = step_E / 4 if min_step_E is None else min_step_E
+    memo = {}
+
+    def npv_at(pv, e):
+        pv = float(np.clip(pv, *PV_range))
+        e = float(np.clip(e, *E_range))
+        key = (round(pv, 6), round(e, 6))
+        if key not in memo:
+            memo[key] = simulate_operation(pv, e, irr_annual, load_annual, cfg, anchor_years=anchor_years)['npv']
+        return memo[key], pv, e
+
+    best, pv, e = npv_at(PV0, E0)
+    while len(memo) < max_evals and (step_PV >= min_step_PV or step_E >= min_step_E):
+        moved = False
+        for dpv in (-step_PV, 0.0, step_PV):
+            for de in (-step_E, 0.0, step_E):
+                if dpv == 0.0 and de == 0.0:
+                    continue
+                val, c_pv, c_e = npv_at(pv + dpv, e + de)
+                if val > best:
+                    best, cand_pv, cand_e, moved = val, c_pv, c_e, True
+        if moved:
+            pv, e = cand_pv, cand_e
+        else:
+            step_PV /= 2
+            step_E /= 2
+    return pv, e, best, len(memo)
+
+
+def _run_chain(args):
+    """Recorre una lista de valores de un parámetro, encadenando el óptimo como punto de partida."""
+    irr_annual, load_annual, cfg, field, values, PV0, E0, PV_range, E_range, step_PV, step_E, anchor_years = args
+    rows = []
+    pv, e = PV0, E0
+    for value in values:
+        variant = _variant(cfg, field, value)
+        pv, e, npv, evals = local_search(irr_annual, load_annual, variant, pv, e, PV_range, E_range,
+                                         step_PV, step_E, anchor_years=anchor_years)
+        rows.append({"parameter": field, "value": value, "PV_kWp": pv, "E_bess_kWh": e,
+                     "npv": npv, "evaluations": evals})
+    return rows
+
+
+def sensitivity_analysis(irr_annual, load_annual, cfg, sweeps, PV_range=(0, 500), E_range=(0, 500), nPV=21, nE=21,
+                         base=None, parallel=True, nprocs=4, executor=None, anchor_years=None):
+    """
+    sweeps: {parámetro: [valores]} (valores numéricos; el valor base se agrega si falta).
+    base: dict con 'PV_kWp' y 'E_bess_kWh' del óptimo base (p. ej. best de
+          grid_search_optimize). Si es None se obtiene con grid_search_optimize.
+          El óptimo base se refina con la misma local_search (y los mismos anchor_years)
+          que las cadenas, para que npv_delta y swing comparen NPV del mismo método.
+
+    Devuelve (spider, tornado):
+      spider: una fila por (parámetro, valor) con el óptimo re-optimizado, variación
+              relativa del parámetro y del NPV respecto al caso base.
+      tornado: una fila por parámetro con el NPV óptimo en el valor mínimo y máximo
+               barrido y el rango (swing), ordenado de mayor a menor impacto.
+    """
+    executor, own_executor = make_executor(parallel, nprocs, executor)
+    try:
+        if base is None:
+            base, _ = grid_search_optimize(irr_annual, load_annual, cfg, PV_range=PV_range, E_range=E_range,
+                                           nPV=nPV, nE=nE, executor=executor, anchor_years=anchor_years)
+            if base is None:
+                raise ValueError("No se encontró un óptimo base factible")
+        step_PV = (PV_range[1] - PV_range[0]) / max(1, nPV - 1)
+        step_E = (E_range[1] - E_range[0]) / max(1, nE - 1)
+        PV0, E0, npv0, evals0 = local_search(irr_annual, load_annual, cfg, float(base['PV_kWp']),
+                                             float(base['E_bess_kWh']), PV_range, E_range, step_PV, step_E,
+                                             anchor_years=anchor_years)
+
+        # Cadenas desde el valor base hacia abajo y hacia arriba
+        tasks = []
+        for field, values in sweeps.items():
+            b = _base_value(cfg, field)
+            below = sorted((v for v in values if v < b), reverse=True)
+            above = sorted(v for v in values if v > b)
+            for chain in (below, above):
+                if chain:
+                    tasks.append((irr_annual, load_annual, cfg, field, chain, PV0, E0, PV_range, E_range,
+                                  step_PV, step_E, anchor_years))
+        chains = executor.map(_run_chain, tasks, chunksize=1)
+    finally:
+        if own_executor:
+            executor.close()
+
+    rows = [row for chain in chains for row in chain]
+    for field in sweeps:
+        rows.append({"parameter": field, "value": _base_value(cfg, field), "PV_kWp": PV0, "E_bess_kWh": E0,
+                     "npv": npv0, "evaluations": evals0})
+    spider = pd.DataFrame(rows)
+    base_values = spider["parameter"].map(lambda f: _base_value(cfg, f))
+    spider["value_rel_change"] = (spider["value"] - base_values) / base_values.replace(0, np.nan)
+    spider["npv_delta"] = spider["npv"] - npv0
+    spider["npv_rel_change"] = spider["npv_delta"] / abs(npv0) if npv0 else np.nan
+    spider = spider.sort_values(["parameter", "value"], ignore_index=True)
+
+    tornado = []
+    for field, g in spider.groupby("parameter", sort=False):
+        low = g.loc[g["value"].idxmin()]
+        high = g.loc[g["value"].idxmax()]
+        tornado.append({"parameter": field, "base_value": _base_value(cfg, field),
+                        "low_value": low["value"], "high_value": high["value"],
+                        "npv_low": low["npv"], "npv_high": high["npv"],
+                        "npv_min": g["npv"].min(), "npv_max": g["npv"].max(),
+                        "swing": g["npv"].max() - g["npv"].min()})
+    tornado = pd.DataFrame(tornado).sort_values("swing", ascending=False, ignore_index=True)
+    return spider, tornado
@@ -0,0 +1,455 @@
+"""
+Servicio HTTP local (asyncio) para cotizaciones rápidas de dimensionamiento.
+
+Mantiene en memoria los perfiles (irradiación y carga 8760), las configuraciones
+registradas y un pool de procesos "tibio", de modo que cada consulta no paga el
+costo de arranque de Python ni la lectura del Excel. Las solicitudes idénticas
+concurrentes se deduplican (todas esperan el mismo trabajo) y los resultados se
+guardan en una caché LRU, por lo que las consultas repetidas responden al instante.
+
+Endpoints (JSON):
+  GET  /health    -> estado, perfiles, configuraciones y tamaño de caché
+  POST /simulate  -> simulate_operation   {PV_kWp, E_bess_kWh, ...}
+  POST /grid      -> grid_search_optimize {PV_range, E_range, nPV, nE, ...}
+  POST /milp      -> milp_optimize        {PV_options, E_options}
+
+Campos comunes: "profile" y "config" (nombres registrados, por defecto "default"),
+"config_overrides" (parámetros de SimulationConfig a sobrescribir) y "stream".
+Con "stream": true la respuesta es NDJSON por chunks con eventos
+queued/running/progress y finalmente result (o error).
+
+Uso:
+    python server.py --excel ruta.xlsm --config config.json --port 8765 --workers 4
+"""
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from simulator import SimulationConfig, simulate_operation
+from optimizer import grid_search_optimize
+from executors import ProcessExecutor
+
+
+# ===========================
+# Lado worker (procesos del pool)
+# ===========================
+
+_WORKER_PROFILES = {}
+_WORKER_CONFIGS = OrderedDict()
+
+# Configuraciones (SimulationConfig) distintas que se mantienen construidas por proceso
+CFG_CACHE_SIZE = 64
+
+# Campos obligatorios por tipo de solicitud
+_REQUIRED_FIELDS = {
+    "simulate": ("PV_kWp", "E_bess_kWh"),
+    "grid": (),
+    "milp": ("PV_options", "E_options"),
+}
+
+
+def _init_worker(profiles):
+    # Los perfiles se envían una sola vez al crear cada proceso del pool
+    global _WORKER_PROFILES
+    _WORKER_PROFILES = profiles
+
+
+def _worker_config(cfg_kwargs):
+    return _cached_config(_WORKER_CONFIGS, cfg_kwargs)
+
+
+def _worker_simulate(args):
+    profile, cfg_kwargs, PV_kWp, E_bess_kWh, capture_day_of_january = args
+    irr, load = _WORKER_PROFILES[profile]
+    cfg = _worker_config(cfg_kwargs)
+    return simulate_operation(PV_kWp, E_bess_kWh, irr, load, cfg, capture_day_of_january=capture_day_of_january)
+
+
+def _worker_profile_task(args):
+    # Tarea liviana de _ProfileExecutor: reconstruye (PV, E, irr, load, cfg, ...) con el perfil
+    # y la configuración que el worker ya tiene en memoria
+    fn, profile, cfg_kwargs, head, tail = args
+    irr, load = _WORKER_PROFILES[profile]
+    return fn(tuple(head) + (irr, load, _worker_config(cfg_kwargs)) + tuple(tail))
+
+
+class _ProfileExecutor:
+    """
+    Adaptador para grid_search_optimize / milp_optimize, cuyas tareas son
+    (PV, E, irr, load, cfg, ...): en vez de serializar los perfiles y la configuración en
+    cada tarea se envía el nombre del perfil (precargado en los workers) y los kwargs.
+    """
+
+    def __init__(self, executor, profile, irr, load, cfg, cfg_kwargs):
+        self.executor = executor
+        self.profile = profile
+        self.irr = irr
+        self.load = load
+        self.cfg = cfg
+        self.cfg_kwargs = cfg_kwargs
+
+    def map(self, fn, tasks, **kwargs):
+        light = []
+        for t in tasks:
+            if t[2] is not self.irr or t[3] is not self.load or t[4] is not self.cfg:
+                raise ValueError("_ProfileExecutor solo acepta tareas con el perfil y la configuración del trabajo")
+            light.append((fn, self.profile, self.cfg_kwargs, t[:2], t[5:]))
+        return self.executor.map(_worker_profile_task, light, **kwargs)
+
+    def close(self):
+        pass
+
+
+# ===========================
+# Utilidades
+# ===========================
+
+def _request_key(kind, payload):
+    blob = json.dumps([kind, payload], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _cached_config(cache, cfg_kwargs, maxsize=CFG_CACHE_SIZE):
+    """SimulationConfig para cfg_kwargs desde una caché LRU acotada (OrderedDict)."""
+    key = _request_key("cfg", cfg_kwargs)
+    cfg = cache.get(key)
+    if cfg is None:
+        cfg = SimulationConfig(**cfg_kwargs)
+        cache[key] = cfg
+        while len(cache) > maxsize:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return cfg
+
+
+def _error_message(exc):
+    # KeyError agrega comillas en str(); se usa el mensaje original
+    if isinstance(exc, KeyError) and exc.args:
+        return str(exc.args[0])
+    return str(exc)
+
+
+def _to_jsonable(obj):
+    if isinstance(obj, dict):
+        return {str(k): _to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_jsonable(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return [_to_jsonable(v) for v in obj.tolist()]
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    return obj
+
+
+class _Job:
+    def __init__(self, key, loop):
+        self.key = key
+        self.future = loop.create_future()
+        self.subscribers = []
+        self.last_event = {"event": "queued"}
+
+    def publish(self, event):
+        self.last_event = event
+        for q in self.subscribers:
+            q.put_nowait(event)
+
+    def subscribe(self):
+        q = asyncio.Queue()
+        q.put_nowait(self.last_event)
+        self.subscribers.append(q)
+        return q
+
+
+# ===========================
+# Servicio
+# ===========================
+
+class SizingService:
+    """
+    Mantiene perfiles, configuraciones, pool de procesos y caché de resultados.
+
+    profiles: {nombre: (irr_8760, load_8760)}
+    configs:  {nombre: kwargs de SimulationConfig}
+    """
+
+    def __init__(self, profiles, configs, nprocs=4, max_jobs=2, cache_size=256):
+        self.profiles = {name: (np.asarray(irr, dtype=float), np.asarray(load, dtype=float))
+                         for name, (irr, load) in profiles.items()}
+        self.configs = dict(configs)
+        self.nprocs = nprocs
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._heavy = asyncio.Semaphore(max_jobs)   # cola para grid/milp
+        self._executor = None
+        self._threads = None
+        self._cfg_objects = OrderedDict()
+
+    def start(self):
+        # Un solo pool tibio (simulaciones, grid search y precómputo MILP) con los perfiles
+        # precargados; "spawn" evita que los workers hereden los sockets abiertos del servidor
+        self._executor = ProcessExecutor(self.nprocs, start_method="spawn", initializer=_init_worker,
+                                         initargs=(self.profiles,))
+        self._threads = ThreadPoolExecutor(max_workers=max(2, self.nprocs))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.close()
+        if self._threads is not None:
+            self._threads.shutdown(cancel_futures=True)
+
+    # --- Resolución de perfil y configuración ---
+
+    def _resolve(self, payload):
+        profile = payload.get("profile", "default")
+        if profile not in self.profiles:
+            raise KeyError(f"Perfil desconocido: {profile}")
+        cfg_name = payload.get("config", "default")
+        if cfg_name not in self.configs:
+            raise KeyError(f"Configuración desconocida: {cfg_name}")
+        cfg_kwargs = dict(self.configs[cfg_name])
+        cfg_kwargs.update(payload.get("config_overrides") or {})
+        return profile, cfg_kwargs
+
+    def _cfg(self, cfg_kwargs):
+        return _cached_config(self._cfg_objects, cfg_kwargs)
+
+    # --- Cola, deduplicación y caché ---
+
+    def submit(self, kind, payload):
+        """Devuelve el _Job (nuevo o ya en curso) asociado a la solicitud."""
+        if kind not in _REQUIRED_FIELDS:
+            raise KeyError(f"Tipo de solicitud desconocido: {kind}")
+        if not isinstance(payload, dict):
+            raise TypeError("El cuerpo de la solicitud debe ser un objeto JSON")
+        missing = [f for f in _REQUIRED_FIELDS[kind] if payload.get(f) is None]
+        if missing:
+            raise ValueError(f"Faltan campos requeridos: {', '.join(missing)}")
+        overrides = payload.get("config_overrides")
+        if overrides is not None and not isinstance(overrides, dict):
+            raise TypeError("config_overrides debe ser un objeto JSON")
+        profile, cfg_kwargs = self._resolve(payload)
+        request = {k: v for k, v in payload.items() if k not in ("stream", "profile", "config", "config_overrides")}
+        key = _request_key(kind, {"profile": profile, "cfg": cfg_kwargs, "request": request})
+
+        loop = asyncio.get_running_loop()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            job = _Job(key, loop)
+            job.future.set_result(self._cache[key])
+            job.last_event = {"event": "result", "cached": True, "result": self._cache[key]}
+            return job
+        if key in self._inflight:
+            return self._inflight[key]
+
+        job = _Job(key, loop)
+        self._inflight[key] = job
+        loop.create_task(self._run(job, kind, profile, cfg_kwargs, request))
+        return job
+
+    async def _run(self, job, kind, profile, cfg_kwargs, request):
+        try:
+            if kind == "simulate":
+                result = await self._simulate(job, profile, cfg_kwargs, request)
+            else:
+                async with self._heavy:
+                    result = await self._optimize(job, kind, profile, cfg_kwargs, request)
+            result = _to_jsonable(result)
+            self._cache[job.key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            job.future.set_result(result)
+            job.publish({"event": "result", "cached": False, "result": result})
+        except Exception as exc:
+            job.future.set_exception(exc)
+            job.publish({"event": "error", "error": _error_message(exc)})
+        finally:
+            self._inflight.pop(job.key, None)
+
+    async def _simulate(self, job, profile, cfg_kwargs, request):
+        loop = asyncio.get_running_loop()
+        job.publish({"event": "running"})
+        task = (profile, cfg_kwargs, float(request["PV_kWp"]), float(request["E_bess_kWh"]),
+                request.get("capture_day_of_january"))
+        results = await loop.run_in_executor(self._threads, self._executor.map, _worker_simulate, [task])
+        return results[0]
+
+    async def _optimize(self, job, kind, profile, cfg_kwargs, request):
+        loop = asyncio.get_running_loop()
+        irr, load = self.profiles[profile]
+        cfg = self._cfg(cfg_kwargs)
+        executor = _ProfileExecutor(self._executor, profile, irr, load, cfg, cfg_kwargs)
+        job.publish({"event": "running"})
+
+        def progress(done, total):
+            loop.call_soon_threadsafe(job.publish, {"event": "progress", "done": done, "total": total})
+
+        if kind == "grid":
+            def run():
+                best, df = grid_search_optimize(
+                    irr, load, cfg,
+                    PV_range=tuple(request.get("PV_range", (0, 500))),
+                    E_range=tuple(request.get("E_range", (0, 500))),
+                    nPV=int(request.get("nPV", 21)),
+                    nE=int(request.get("nE", 21)),
+                    executor=executor,
+                    refine_steps=int(request.get("refine_steps", 2)),
+                    refine_factor=float(request.get("refine_factor", 0.25)),
+                    progress=progress)
+                top = df.sort_values("npv", ascending=False).head(int(request.get("top", 10)))
+                top = top[["PV_kWp", "E_bess_kWh", "npv", "Feasible", "CAPEX", "Payback_yr"]]
+                return {"best": best, "n_evaluations": len(df), "top": top.to_dict(orient="records")}
+        else:
+            from milp import milp_optimize   # pulp es opcional
+
+            def run():
+                best_pv, best_e, best_res = milp_optimize(
+                    irr, load, cfg,
+                    PV_options=list(request["PV_options"]),
+                    E_options=list(request["E_options"]),
+                    progress=progress,
+                    executor=executor)
+                return {"PV_kWp": best_pv, "E_bess_kWh": best_e, "result": best_res}
+
+        return await loop.run_in_executor(self._threads, run)
+
+    # --- HTTP ---
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            parts = request_line.split(" ", 2)
+            if len(parts) != 3:
+                await self._send_json(writer, 400, {"error": f"Línea de solicitud inválida: {request_line}"})
+                return
+            method, path, _ = parts
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = b""
+            try:
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                await self._send_json(writer, 400, {"error": "Content-Length inválido"})
+                return
+            if length:
+                body = await reader.readexactly(length)
+
+            if method == "GET" and path == "/health":
+                await self._send_json(writer, 200, {
+                    "status": "ok",
+                    "profiles": sorted(self.profiles),
+                    "configs": sorted(self.configs),
+                    "cached": len(self._cache),
+                    "inflight": len(self._inflight),
+                })
+                return
+            if method != "POST" or path not in ("/simulate", "/grid", "/milp"):
+                await self._send_json(writer, 404, {"error": f"Ruta no encontrada: {method} {path}"})
+                return
+
+            try:
+                payload = json.loads(body or b"{}")
+                job = self.submit(path[1:], payload)
+            except (ValueError, KeyError, TypeError) as exc:
+                await self._send_json(writer, 400, {"error": _error_message(exc)})
+                return
+
+            if payload.get("stream"):
+                await self._stream(writer, job)
+                return
+            try:
+                result = await asyncio.shield(job.future)
+            except (ValueError, KeyError, TypeError) as exc:
+                await self._send_json(writer, 400, {"error": _error_message(exc)})
+                return
+            except Exception as exc:
+                await self._send_json(writer, 500, {"error": str(exc)})
+                return
+            await self._send_json(writer, 200, result)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send_json(self, writer, status, obj):
+        data = json.dumps(obj).encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\n"
+                     "Content-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n"
+                     "Connection: close\r\n\r\n".encode("latin-1") + data)
+        await writer.drain()
+
+    async def _stream(self, writer, job):
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\n"
+                     b"Connection: close\r\n\r\n")
+        q = job.subscribe()
+        try:
+            while True:
+                event = await q.get()
+                data = json.dumps(event).encode("utf-8") + b"\n"
+                writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+                await writer.drain()
+                if event["event"] in ("result", "error"):
+                    break
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            job.subscribers.remove(q)
+
+
+async def serve(service, host="127.0.0.1", port=8765):
+    service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Servidor de dimensionamiento escuchando en http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    multiprocessing.freeze_support()
+
+    from data_loader import read_irradiation_from_excel, expand_monthly_matrix_to_annual_hourly, read_load_hourly_from_excel
+
+    parser = argparse.ArgumentParser(description="Servidor HTTP local de dimensionamiento off-grid")
+    parser.add_argument("--excel", required=True, help="Planilla con irradiación 24x12 y carga 8760")
+    parser.add_argument("--sheet", default="Gen_Cons_Horario")
+    parser.add_argument("--config", required=True, help="JSON con los parámetros de SimulationConfig")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--cache-size", type=int, default=256)
+    args = parser.parse_args()
+
+    irr_8760 = expand_monthly_matrix_to_annual_hourly(read_irradiation_from_excel(args.excel, sheet_name=args.sheet))
+    load_8760 = read_load_hourly_from_excel(args.excel, sheet_name=args.sheet)
+    with open(args.config, encoding="utf-8") as f:
+        cfg_kwargs = json.load(f)
+
+    service = SizingService({"default": (irr_8760, load_8760)}, {"default": cfg_kwargs},
+                            nprocs=args.workers, cache_size=args.cache_size)
+    asyncio.run(serve(service, args.host, args.port))
@@ -1,7 +1,66 @@
+import hashlib
+import os
+
 import numpy as np
 from funciones import interp_lph_from_curve
 
+
+def _freeze(value):
+    # Convierte listas/arreglos/dicts en tuplas para poder comparar y hashear la configuración
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _canonical(value):
+    # Forma canónica para content_hash: los números (int, float, numpy) se normalizan a float,
+    # así DG_power=32 y DG_power=32.0 (iguales bajo __eq__) comparten hash
+    if isinstance(value, tuple):
+        return tuple(_canonical(v) for v in value)
+    if isinstance(value, (bool, np.bool_)) or value is None:
+        return value
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    return value
+
+
+def _readonly(values):
+    arr = np.array(values, dtype=float)
+    arr.setflags(write=False)
+    return arr
+
+
+def _config_from_params(params):
+    return SimulationConfig(**dict(params))
+
+
 class SimulationConfig:
+    """
+    Configuración inmutable de la simulación.
+
+    Se valida al construirse y precalcula como arreglos NumPy de solo lectura todos los
+    factores por año, indexados por año (índice 0 = año 0):
+      df_year[y]               factor de descuento
+      deg_pv[y]                factor de degradación FV
+      bess_capacity_factors[y] factor de capacidad BESS (se usa desde el índice 1)
+      diesel_price[y]          precio del diésel escalado por diesel_inflation
+      cpi_factor[y]            factor (1 + cpi)^y
+    Es hasheable (content_hash estable), se serializa solo con sus parámetros y para
+    derivar variantes se usa replace(**cambios).
+    """
+
+    __slots__ = ("_params", "content_hash",
+                 "N_years", "r", "cpi", "diesel_inflation", "df_year",
+                 "charge_ef", "discharge_ef", "DOD", "soc_min_frac", "soc_max_frac",
+                 "charge_rate", "discharge_rate", "pv_deg_rate", "bess_capacity_factors", "deg_pv",
+                 "DG_performance_factors", "DG_power", "fuel_curve",
+                 "C_diesel_lt", "C_pv_kWp", "C_bess_kWh", "C_om_pv_kW_yr", "C_om_bess_kWh_yr", "DG_opex",
+                 "battery_replacement", "diesel_price", "cpi_factor")
+
     def __init__(self,
                 N_years=15,                    # Número de años de simulación
                 r=0.07,                        # Tasa de descuento               
@@ -10,7 +69,7 @@ class SimulationConfig:
                 DOD=0.8,                       # DOD de la batería
                 charge_rate=0.5,               # 0.5C Capacidad máxima de carga       
                 discharge_rate=0.5,            # 0.5C Capacidad máxima de descarga 
-                bess_capacity_factors=None,    # Lista de factores de capacidad del BESS por año (1.0 = sin degradación)                      
+                bess_capacity_factors=None,    # Lista de factores de capacidad del BESS por año 0..N_years (1.0 = sin degradación)
                 pv_deg_rate=0.005,             # Degradación 0.5% anual
 
                 C_pv_kWp=817309.0,             # Costo del kW en FV               
@@ -28,37 +87,337 @@ class SimulationConfig:
                 diesel_inflation = 0.02,       # Inflación del costo del diésel
                 battery_replacement=None):     # Diccionario {año: costo por kWh} para reemplazo de batería en años específicos
 
-        self.N_years = N_years
-        self.r = r
-        self.cpi = cpi
-        self.diesel_inflation = diesel_inflation
-        self.df_year = {y: 1.0 / ((1.0 + r) ** (y)) for y in range(1, N_years + 1)}                 # Factor de descuento por año
-        
-        self.charge_ef = ef_charge
-        self.discharge_ef = ef_discharge
-        self.DOD = DOD
-        self.soc_min_frac = (1.0 - DOD)/2
-        self.soc_max_frac = 1.0 - self.soc_min_frac
-        self.charge_rate = charge_rate
-        self.discharge_rate = discharge_rate
-        self.pv_deg_rate = pv_deg_rate
-        self.bess_capacity_factors = bess_capacity_factors if bess_capacity_factors is not None else [1.0]*self.N_years
-        self.deg_pv = {y: (1 - self.pv_deg_rate) ** (y) for y in range(1, self.N_years + 1)}
-
-        self.DG_performance_factors = DG_performance_factors
-        self.DG_power = DG_power
-        
-
-        self.C_diesel_lt = C_diesel_lt
-        self.C_pv_kWp = C_pv_kWp
-        self.C_bess_kWh = C_bess_kWh
-        self.C_om_pv_kW_yr = C_om_pv_kW_yr
-        self.C_om_bess_kWh_yr = C_om_bess_kWh_yr
-        self.DG_opex = DG_opex
-
-        self.battery_replacement = battery_replacement
-
-def simulate_operation(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg: SimulationConfig, capture_day_of_january=None):
+        # --- Validación ---
+        if not isinstance(N_years, (int, np.integer)) or N_years < 1:
+            raise ValueError("N_years debe ser un entero >= 1")
+        if not 0.0 < DOD <= 1.0:
+            raise ValueError("DOD debe estar en (0, 1]")
+        if not (0.0 < ef_charge <= 1.0 and 0.0 < ef_discharge <= 1.0):
+            raise ValueError("ef_charge y ef_discharge deben estar en (0, 1]")
+        if charge_rate < 0 or discharge_rate < 0:
+            raise ValueError("charge_rate y discharge_rate deben ser >= 0")
+        if not 0.0 <= pv_deg_rate < 1.0:
+            raise ValueError("pv_deg_rate debe estar en [0, 1)")
+        if bess_capacity_factors is None:
+            bess_capacity_factors = [1.0] * (N_years + 1)
+        if len(bess_capacity_factors) < N_years + 1:
+            # El índice y del año se usa directamente (el año 1 usa bess_capacity_factors[1])
+            raise ValueError(f"bess_capacity_factors necesita N_years + 1 = {N_years + 1} valores (años 0..N_years), "
+                             f"se recibieron {len(bess_capacity_factors)}")
+        if DG_performance_factors is not None and len(DG_performance_factors) != 4:
+            raise ValueError("DG_performance_factors debe tener 4 valores (25%, 50%, 75% y 100% de carga)")
+
+        # Parámetros normalizados (para comparar, hashear y derivar variantes con replace):
+        # N_years como int y bess_capacity_factors con el default aplicado y recortado a N_years + 1,
+        # así la configuración por defecto y su equivalente explícito son iguales
+        bess_capacity_factors = [float(f) for f in bess_capacity_factors[:N_years + 1]]
+        params = _freeze(dict(N_years=int(N_years), r=r, ef_charge=ef_charge, ef_discharge=ef_discharge, DOD=DOD,
+                              charge_rate=charge_rate, discharge_rate=discharge_rate,
+                              bess_capacity_factors=bess_capacity_factors, pv_deg_rate=pv_deg_rate,
+                              C_pv_kWp=C_pv_kWp, C_bess_kWh=C_bess_kWh, C_om_pv_kW_yr=C_om_pv_kW_yr,
+                              C_om_bess_kWh_yr=C_om_bess_kWh_yr, C_diesel_lt=C_diesel_lt,
+                              DG_performance_factors=DG_performance_factors, DG_power=DG_power, DG_opex=DG_opex,
+                              cpi=cpi, diesel_inflation=diesel_inflation, battery_replacement=battery_replacement))
+
+        setattr_ = object.__setattr__
+        setattr_(self, "_params", params)
+        setattr_(self, "content_hash", hashlib.sha256(repr(_canonical(params)).encode("utf-8")).hexdigest())
+
+        setattr_(self, "N_years", int(N_years))
+        setattr_(self, "r", r)
+        setattr_(self, "cpi", cpi)
+        setattr_(self, "diesel_inflation", diesel_inflation)
+        years = range(0, N_years + 1)
+        setattr_(self, "df_year", _readonly([1.0 / ((1.0 + r) ** (y)) for y in years]))              # Factor de descuento por año
+
+        setattr_(self, "charge_ef", ef_charge)
+        setattr_(self, "discharge_ef", ef_discharge)
+        setattr_(self, "DOD", DOD)
+        setattr_(self, "soc_min_frac", (1.0 - DOD)/2)
+        setattr_(self, "soc_max_frac", 1.0 - self.soc_min_frac)
+        setattr_(self, "charge_rate", charge_rate)
+        setattr_(self, "discharge_rate", discharge_rate)
+        setattr_(self, "pv_deg_rate", pv_deg_rate)
+        setattr_(self, "bess_capacity_factors", _readonly(bess_capacity_factors))
+        setattr_(self, "deg_pv", _readonly([(1 - pv_deg_rate) ** (y) for y in years]))
+
+        setattr_(self, "DG_performance_factors", None if DG_performance_factors is None else tuple(DG_performance_factors))
+        setattr_(self, "DG_power", DG_power)
+        curve = None
+        if DG_performance_factors is not None:
+            curve = {25: DG_performance_factors[0], 50: DG_performance_factors[1],
+                     75: DG_performance_factors[2], 100: DG_performance_factors[3]}
+        setattr_(self, "fuel_curve", curve)
+
+        setattr_(self, "C_diesel_lt", C_diesel_lt)
+        setattr_(self, "C_pv_kWp", C_pv_kWp)
+        setattr_(self, "C_bess_kWh", C_bess_kWh)
+        setattr_(self, "C_om_pv_kW_yr", C_om_pv_kW_yr)
+        setattr_(self, "C_om_bess_kWh_yr", C_om_bess_kWh_yr)
+        setattr_(self, "DG_opex", DG_opex)
+        setattr_(self, "diesel_price", _readonly([C_diesel_lt * ((1 + diesel_inflation) ** (y)) for y in years]))
+        setattr_(self, "cpi_factor", _readonly([(1 + cpi) ** (y) for y in years]))
+
+        setattr_(self, "battery_replacement", None if battery_replacement is None else dict(battery_replacement))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SimulationConfig es inmutable; usa replace(...) para crear una variante")
+
+    def __delattr__(self, name):
+        raise AttributeError("SimulationConfig es inmutable")
+
+    def __reduce__(self):
+        # Solo viajan los parámetros; los arreglos derivados se recalculan al deserializar
+        return (_config_from_params, (self._params,))
+
+    def __eq__(self, other):
+        return isinstance(other, SimulationConfig) and self._params == other._params
+
+    def __hash__(self):
+        return hash(self._params)
+
+    def __repr__(self):
+        return f"SimulationConfig({', '.join(f'{k}={v!r}' for k, v in self._params)})"
+
+    @property
+    def params(self):
+        return dict(self._params)
+
+    def replace(self, **changes):
+        """Nueva configuración con los parámetros del constructor indicados cambiados."""
+        unknown = set(changes) - set(self.params)
+        if unknown:
+            raise ValueError(f"Parámetros desconocidos para SimulationConfig: {sorted(unknown)}")
+        params = self.params
+        if ("N_years" in changes and "bess_capacity_factors" not in changes
+                and all(f == 1.0 for f in params["bess_capacity_factors"])):
+            # Factores por defecto (sin degradación): se regeneran para el nuevo horizonte
+            params["bess_capacity_factors"] = None
+        params.update(changes)
+        return SimulationConfig(**params)
+
+def _dispatch_hours(PV_kWp, E_bess_kWh, irr_annual, load_annual, h0, h1, soc, degpv, bess_factor, cfg, curve,
+                    capture_hours_range=None, hourly_capture=None, trace=None):
+    """
+    Despacho hora a hora (FV -> carga, excedente -> BESS, BESS -> carga, resto -> generador)
+    para las horas [h0, h1) partiendo del SOC indicado.
+
+    Devuelve (soc_final, totales) con totales = (pv_served, bess_served, gen_served,
+    fuel_liters_hybrid, fuel_liters_genonly, losses, gen_hours, load_hours, generación).
+    trace: lista opcional; se agrega por hora (soc al final de la hora,) + aporte de la hora
+    a cada total, en el mismo orden (lo usa el modo especulativo para re-sumar tramos).
+    """
+    pv_served = 0.0
+    bess_served = 0.0
+    gen_served = 0.0
+    fuel_liters_year_hybrid = 0.0
+    fuel_liters_year_genonly = 0.0
+    losses_year = 0.0
+    gen_hours_year = 0
+    load_hours_year = 0
+    generación_anual = 0.0
+
+
+    hourly_charging_limit = E_bess_kWh * cfg.charge_rate
+    hourly_discharging_limit = E_bess_kWh * cfg.discharge_rate
+
+    for h in range(h0, h1):
+        irr = irr_annual[h]
+        load = load_annual[h]
+        if load > 0:
+            load_hours_year += 1
+
+        pv_gen = PV_kWp * irr * degpv  # Se divide en 1000 para pasar de W a kW
+        generación_anual += pv_gen
+        delivered = 0.0
+        gen_kwh = 0.0
+        loss = 0.0
+        lph = 0.0
+        fuel_lph_only = 0.0
+        #fuel = 0.0
+
+        pv_to_load = min(pv_gen, load)
+        pv_served += pv_to_load
+        remaining_load = load - pv_to_load
+        pv_excess = pv_gen - pv_to_load
+
+        # Si hay carga remanente, intentar cubrirla con BESS
+        if pv_excess > 1e-6:
+            space = (E_bess_kWh * bess_factor * cfg.soc_max_frac) - soc
+            needed_input_to_fill = space / cfg.charge_ef if cfg.charge_ef > 0 else 0.0
+            can_charge = min(pv_excess, hourly_charging_limit/cfg.charge_ef, needed_input_to_fill)
+            soc += can_charge * cfg.charge_ef
+            loss = pv_excess - can_charge
+            losses_year += loss
+
+
+        if remaining_load > 1e-6:
+            soc_min = cfg.soc_min_frac * E_bess_kWh * bess_factor
+            available_for_discharge = max(0.0, soc - soc_min)
+            can_discharge = min(available_for_discharge, hourly_discharging_limit, remaining_load / cfg.discharge_ef)
+            delivered = can_discharge * cfg.discharge_ef
+            soc -= can_discharge
+            remaining_load -= delivered
+            bess_served += delivered
+
+
+        if remaining_load > 1e-6:
+            gen_kwh = remaining_load
+            gen_served += gen_kwh
+            percent_load = (gen_kwh / cfg.DG_power) * 100.0 if cfg.DG_power > 0 else 100.0
+            percent_for_fuel = percent_load
+
+            # interpolar litros/hora para el porcentaje dado
+            lph = interp_lph_from_curve(percent_for_fuel, curve)
+            fuel_liters_year_hybrid += lph  # 1 hora
+            gen_hours_year += 1
+            remaining_load = 0.0
+
+            #fuel = remaining_load
+            #fuel_consumed_year += fuel
+            #remaining_load = 0.0
+            #gen_hours_year += 1
+
+        # Para escenario "solo generador": genset debe servir toda la carga 'load'
+        if load > 1e-12:
+            percent_only = (load / cfg.DG_power) * 100.0 if cfg.DG_power > 0 else 100.0
+            if percent_only > 100.0:
+                raise ValueError("El tamaño del generador no es suficiente para suplir el consumo del caso solo genset.")
+            else:
+                fuel_lph_only = interp_lph_from_curve(percent_only, curve)
+            fuel_liters_year_genonly += fuel_lph_only
+
+
+        # Captura horaria del día seleccionado
+        if capture_hours_range is not None and capture_hours_range[0] <= h < capture_hours_range[1]:
+            hourly_capture["load"].append(load)
+            hourly_capture["from_pv"].append(pv_to_load)
+            hourly_capture["from_bess"].append(delivered)
+            hourly_capture["from_gen"].append(gen_kwh)
+            hourly_capture["soc"].append(soc)
+            hourly_capture["pv_gen"].append(pv_gen)
+        #    print("Consumo desde BESS ", delivered,". Consumo desde PV ", pv_to_load, "Consumo desde GEN ", fuel, ". SOC ", soc, ". Gen ", pv_gen)
+
+        if trace is not None:
+            trace.append((soc, pv_to_load, delivered, gen_kwh, lph, fuel_lph_only, loss,
+                          1 if gen_kwh > 0.0 else 0, 1 if load > 0 else 0, pv_gen))
+
+        #if y==1 and h < 24:
+        #    print("Consumo desde BESS ", delivered,". Consumo desde PV ", pv_to_load, "Consumo desde GEN ", gen_kwh, ". SOC ", soc, ". Gen ", pv_gen)
+
+    return soc, (pv_served, bess_served, gen_served, fuel_liters_year_hybrid, fuel_liters_year_genonly,
+                 losses_year, gen_hours_year, load_hours_year, generación_anual)
+
+
+def _interpolate_years(physical_by_year, anchors):
+    """Completa in situ los años entre anclas interpolando linealmente (SOC final y totales físicos)."""
+    for a, b in zip(anchors[:-1], anchors[1:]):
+        va, vb = physical_by_year[a], physical_by_year[b]
+        for y in range(a + 1, b):
+            t = (y - a) / (b - a)
+            vals = [x0 + t * (x1 - x0) for x0, x1 in zip(va, vb)]
+            vals[7] = int(round(vals[7]))   # horas generador ON
+            vals[8] = int(round(vals[8]))   # horas con carga
+            physical_by_year[y] = tuple(vals)
+
+
+def _speculate_year(args):
+    """Tarea del modo especulativo: despacha un año completo desde un SOC supuesto guardando la traza horaria."""
+    PV_kWp, E_bess_kWh, irr_annual, load_annual, soc, degpv, bess_factor, cfg, capture_hours_range, hourly_capture = args
+    trace = []
+    soc, totals = _dispatch_hours(PV_kWp, E_bess_kWh, irr_annual, load_annual, 0, len(irr_annual), soc, degpv,
+                                  bess_factor, cfg, cfg.fuel_curve, capture_hours_range, hourly_capture, trace)
+    return soc, totals, np.array(trace), hourly_capture
+
+
+def _reconcile_year(PV_kWp, E_bess_kWh, irr_annual, load_annual, soc, guess, spec, degpv, bess_factor, cfg, curve,
+                    soc_tol, block):
+    """
+    Ajusta un año especulado (desde el SOC supuesto guess) al SOC inicial real: re-despacha por
+    bloques de `block` horas hasta que el SOC coincide con la traza especulada (|ΔSOC| <= soc_tol)
+    y desde ahí reutiliza la traza. Los totales se re-suman hora a hora en el orden del despacho,
+    por lo que con soc_tol=0 son idénticos a los de la simulación secuencial.
+    Devuelve (soc_final, totales, horas re-despachadas).
+    """
+    spec_soc, spec_totals, spec_trace = spec
+    if abs(soc - guess) <= soc_tol:
+        return spec_soc, spec_totals, 0
+
+    n = len(irr_annual)
+    prefix = []
+    k = n
+    h = 0
+    while h < n:
+        h1 = min(n, h + block)
+        soc, _ = _dispatch_hours(PV_kWp, E_bess_kWh, irr_annual, load_annual, h, h1, soc, degpv, bess_factor,
+                                 cfg, curve, trace=prefix)
+        diff = np.abs(np.array([row[0] for row in prefix[h:h1]]) - spec_trace[h:h1, 0])
+        hit = np.flatnonzero(diff <= soc_tol)
+        if hit.size:
+            k = h + int(hit[0]) + 1
+            break
+        h = h1
+
+    rows = np.array(prefix[:k])
+    if k < n:
+        rows = np.vstack([rows, spec_trace[k:]])
+        soc = spec_soc
+    sums = np.cumsum(rows[:, 1:], axis=0)[-1]   # suma secuencial (mismo orden que _dispatch_hours)
+    totals = tuple(float(v) for v in sums[:6]) + (int(sums[6]), int(sums[7]), float(sums[8]))
+    return soc, totals, k
+
+
+def _speculative_years(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg, soc, capture_hours_range, hourly_capture,
+                       executor, soc_tol):
+    """
+    Modo especulativo: todos los años se despachan en paralelo; el año 1 desde el SOC inicial
+    real y los demás desde un SOC supuesto (SOC mínimo del año). Luego, en orden, cada año se
+    reconcilia con el SOC final real del año anterior (ver _reconcile_year).
+    Devuelve (physical_by_year, hourly_capture).
+    """
+    from executors import make_executor
+
+    years = list(range(1, cfg.N_years + 1))
+    guesses = {1: soc}
+    for y in years[1:]:
+        guesses[y] = cfg.soc_min_frac * E_bess_kWh * float(cfg.bess_capacity_factors[y])
+    tasks = []
+    for y in years:
+        capture = (capture_hours_range, hourly_capture) if y == 1 else (None, None)
+        tasks.append((PV_kWp, E_bess_kWh, irr_annual, load_annual, guesses[y], float(cfg.deg_pv[y]),
+                      float(cfg.bess_capacity_factors[y]), cfg) + capture)
+
+    executor, own_executor = make_executor(True, min(len(years), os.cpu_count() or 1), executor)
+    try:
+        specs = executor.map(_speculate_year, tasks, chunksize=1)
+    finally:
+        if own_executor:
+            executor.close()
+
+    curve = cfg.fuel_curve
+    block = max(1, len(irr_annual) // 365)   # un día
+    physical_by_year = {}
+    for y, (spec_soc, spec_totals, spec_trace, capture) in zip(years, specs):
+        if y == 1:
+            hourly_capture = capture
+        soc, totals, _ = _reconcile_year(PV_kWp, E_bess_kWh, irr_annual, load_annual, soc, guesses[y],
+                                         (spec_soc, spec_totals, spec_trace), float(cfg.deg_pv[y]),
+                                         float(cfg.bess_capacity_factors[y]), cfg, curve, soc_tol, block)
+        physical_by_year[y] = (soc,) + tuple(totals)
+    return physical_by_year, hourly_capture
+
+
+def simulate_operation(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg: SimulationConfig, capture_day_of_january=None,
+                       day_cache=None, anchor_years=None, speculative=False, executor=None, soc_tol=0.0):
+    # day_cache: DayCache opcional (day_cache.py) que memoiza el despacho diario
+    # anchor_years: modo fast-forward; simula hora a hora solo estos años (se agregan 1, 2 y N_years)
+    #               e interpola linealmente las métricas físicas de los años intermedios.
+    #               El SOC inicial de cada ancla es el SOC final del ancla anterior. El año 1
+    #               parte del SOC mínimo (efecto de arranque que no tienen los demás años), por
+    #               eso el año 2 se simula siempre y la interpolación parte desde él.
+    # speculative: simula todos los años en paralelo (executor de executors.py; por defecto un
+    #              ProcessExecutor) desde un SOC supuesto y reconcilia cada año con el SOC real.
+    #              Con soc_tol=0 los resultados son idénticos a la simulación secuencial.
     hours_per_year = len(irr_annual)
     if len(load_annual) != hours_per_year:
         raise ValueError("irr_annual y load_annual deben tener igual longitud")
@@ -68,7 +427,7 @@ def simulate_operation(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg: Simulat
     capex = PV_kWp * cfg.C_pv_kWp + E_bess_kWh * cfg.C_bess_kWh
     feasible = True
 
-    soc = cfg.soc_min_frac * E_bess_kWh * cfg.bess_capacity_factors[1]
+    soc = cfg.soc_min_frac * E_bess_kWh * float(cfg.bess_capacity_factors[1])
 
 
     fuel_hybrid_by_year = {}
@@ -99,110 +458,57 @@ def simulate_operation(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg: Simulat
         capture_hours_range = (start_h, end_h)
         hourly_capture = {"load": [], "from_pv": [], "from_bess": [], "from_gen": [], "soc": [], "pv_gen": []}
 
-    curve = {25: cfg.DG_performance_factors[0], 50: cfg.DG_performance_factors[1],
-             75: cfg.DG_performance_factors[2], 100: cfg.DG_performance_factors[3]}
+    curve = cfg.fuel_curve
+    if curve is None:
+        raise ValueError("SimulationConfig requiere DG_performance_factors para simular")
+
+    if day_cache is not None:
+        day_ids = day_cache.day_ids(irr_annual, load_annual)
+
+    # Años simulados hora a hora (todos, o solo los años ancla en modo fast-forward)
+    if anchor_years is None:
+        simulated_years = list(range(1, cfg.N_years + 1))
+    else:
+        simulated_years = sorted({int(a) for a in anchor_years} | {1, min(2, cfg.N_years), cfg.N_years})
+        if simulated_years[0] < 1 or simulated_years[-1] > cfg.N_years:
+            raise ValueError("anchor_years debe estar entre 1 y N_years")
+
+    if speculative and (day_cache is not None or anchor_years is not None):
+        raise ValueError("speculative no es compatible con day_cache ni anchor_years")
+
+    physical_by_year = {}
+    if speculative:
+        physical_by_year, hourly_capture = _speculative_years(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg, soc,
+                                                              capture_hours_range, hourly_capture, executor, soc_tol)
+        simulated_years = []
+    for y in simulated_years:
+        degpv = float(cfg.deg_pv[y])
+        bess_factor = float(cfg.bess_capacity_factors[y])
+        capture = (capture_hours_range, hourly_capture) if y == 1 else (None, None)
+
+        if day_cache is None:
+            soc, totals = _dispatch_hours(PV_kWp, E_bess_kWh, irr_annual, load_annual, 0, hours_per_year,
+                                          soc, degpv, bess_factor, cfg, curve, *capture)
+        else:
+            soc, totals = day_cache.dispatch_year(PV_kWp, E_bess_kWh, irr_annual, load_annual, day_ids,
+                                                  soc, degpv, bess_factor, cfg, curve, *capture)
+        physical_by_year[y] = (soc,) + tuple(totals)
+
+    if anchor_years is not None:
+        _interpolate_years(physical_by_year, simulated_years)
 
     for y in range(1, cfg.N_years + 1):
-        degpv = cfg.deg_pv[y]
-        bess_factor = cfg.bess_capacity_factors[y]
-
-        pv_served = 0.0
-        bess_served = 0.0
-        gen_served = 0.0
-        fuel_liters_year_hybrid = 0.0
-        fuel_liters_year_genonly = 0.0
-        losses_year = 0.0
-        gen_hours_year = 0
-        load_hours_year = 0
-        generación_anual = 0.0
-        
-
-        hourly_charging_limit = E_bess_kWh * cfg.charge_rate
-        hourly_discharging_limit = E_bess_kWh * cfg.discharge_rate
-
-        for h in range(hours_per_year):
-            irr = irr_annual[h]
-            load = load_annual[h]
-            if load > 0:
-                load_hours_year += 1
-
-            pv_gen = PV_kWp * irr * degpv  # Se divide en 1000 para pasar de W a kW
-            generación_anual += pv_gen
-            delivered = 0.0
-            gen_kwh = 0.0
-            #fuel = 0.0
-
-            pv_to_load = min(pv_gen, load)
-            pv_served += pv_to_load
-            remaining_load = load - pv_to_load
-            pv_excess = pv_gen - pv_to_load
-
-            # Si hay carga remanente, intentar cubrirla con BESS
-            if pv_excess > 1e-6:
-                space = (E_bess_kWh * bess_factor * cfg.soc_max_frac) - soc
-                needed_input_to_fill = space / cfg.charge_ef if cfg.charge_ef > 0 else 0.0
-                can_charge = min(pv_excess, hourly_charging_limit/cfg.charge_ef, needed_input_to_fill)
-                soc += can_charge * cfg.charge_ef
-                losses_year += pv_excess - can_charge
-
-
-            if remaining_load > 1e-6:
-                soc_min = cfg.soc_min_frac * E_bess_kWh * bess_factor
-                available_for_discharge = max(0.0, soc - soc_min)
-                can_discharge = min(available_for_discharge, hourly_discharging_limit, remaining_load / cfg.discharge_ef)
-                delivered = can_discharge * cfg.discharge_ef
-                soc -= can_discharge
-                remaining_load -= delivered
-                bess_served += delivered
-
-
-            if remaining_load > 1e-6:
-                gen_kwh = remaining_load
-                gen_served += gen_kwh
-                percent_load = (gen_kwh / cfg.DG_power) * 100.0 if cfg.DG_power > 0 else 100.0
-                percent_for_fuel = percent_load
-
-                # interpolar litros/hora para el porcentaje dado
-                lph = interp_lph_from_curve(percent_for_fuel, curve)
-                fuel_liters_year_hybrid += lph  # 1 hora
-                gen_hours_year += 1
-                remaining_load = 0.0
-
-                #fuel = remaining_load
-                #fuel_consumed_year += fuel
-                #remaining_load = 0.0
-                #gen_hours_year += 1
-            
-            # Para escenario "solo generador": genset debe servir toda la carga 'load'
-            if load > 1e-12:
-                percent_only = (load / cfg.DG_power) * 100.0 if cfg.DG_power > 0 else 100.0
-                if percent_only > 100.0:
-                    raise ValueError("El tamaño del generador no es suficiente para suplir el consumo del caso solo genset.")
-                else:
-                    fuel_lph_only = interp_lph_from_curve(percent_only, curve)
-                fuel_liters_year_genonly += fuel_lph_only
-
-
-            # Captura horaria del día seleccionado (solo año 1)
-            if y == 1 and capture_hours_range is not None and capture_hours_range[0] <= h < capture_hours_range[1]:
-                hourly_capture["load"].append(load)
-                hourly_capture["from_pv"].append(pv_to_load)
-                hourly_capture["from_bess"].append(delivered)
-                hourly_capture["from_gen"].append(gen_kwh)
-                hourly_capture["soc"].append(soc)
-                hourly_capture["pv_gen"].append(pv_gen)
-            #    print("Consumo desde BESS ", delivered,". Consumo desde PV ", pv_to_load, "Consumo desde GEN ", fuel, ". SOC ", soc, ". Gen ", pv_gen)
-
-            #if y==1 and h < 24:
-            #    print("Consumo desde BESS ", delivered,". Consumo desde PV ", pv_to_load, "Consumo desde GEN ", gen_kwh, ". SOC ", soc, ". Gen ", pv_gen)
-
+        (soc, pv_served, bess_served, gen_served, fuel_liters_year_hybrid, fuel_liters_year_genonly,
+         losses_year, gen_hours_year, load_hours_year, generación_anual) = physical_by_year[y]
 
         soc_end_by_year[y] = soc
         losses_by_year[y] = losses_year
         fuel_hybrid_by_year[y] = round(float(fuel_liters_year_hybrid), 2)
         fuel_genonly_by_year[y] = round(float(fuel_liters_year_genonly), 2)
 
-        price_year = cfg.C_diesel_lt * ((1 + cfg.diesel_inflation) ** (y))
+        price_year = float(cfg.diesel_price[y])
+        cpi_factor = float(cfg.cpi_factor[y])
+        df_year = float(cfg.df_year[y])
         fuel_cost_hybrid[y] = round(float(fuel_liters_year_hybrid * price_year), 2)
         fuel_cost_genonly[y] = round(float(fuel_liters_year_genonly * price_year), 2)
         #served_by_clean = (load_total_year - fuel_consumed_year)  # en kWh
@@ -212,7 +518,7 @@ def simulate_operation(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg: Simulat
         cost_saved = fuel_cost_genonly[y] - fuel_cost_hybrid[y]
         #fuel_savings_liters[y] = round(float(liters_saved), 2)
         fuel_savings_cost[y] = round(float(cost_saved), 2)
-        fuel_savings_cost_discounted[y] = round(float(cost_saved * cfg.df_year[y]), 2)
+        fuel_savings_cost_discounted[y] = round(float(cost_saved * df_year), 2)
 
         consumo_desde_pv[y] = round(float(pv_served), 2)
         consumo_desde_bess[y] = round(float(bess_served), 2)
@@ -220,13 +526,13 @@ def simulate_operation(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg: Simulat
         generacion_por_año[y] = round(float(generación_anual), 2)
         gen_hours[y] = gen_hours_year
 
-        GEN_opex_year = cfg.DG_opex *(load_hours_year - gen_hours_year) * ((1 + cfg.cpi) ** (y))
-        PV_BESS_opex = (cfg.C_om_pv_kW_yr + cfg.C_om_bess_kWh_yr) * ((1 + cfg.cpi) ** (y))
+        GEN_opex_year = cfg.DG_opex *(load_hours_year - gen_hours_year) * cpi_factor
+        PV_BESS_opex = (cfg.C_om_pv_kW_yr + cfg.C_om_bess_kWh_yr) * cpi_factor
         PV_BESS_GEN_opex_by_year[y] = {"pv_bess": PV_BESS_opex,"gen": GEN_opex_year}
 
         gross_savings_year = cost_saved - PV_BESS_opex + GEN_opex_year
         gross_savings[y] = gross_savings_year
-        net_savings_by_year[y] = (gross_savings_year) * cfg.df_year[y]
+        net_savings_by_year[y] = (gross_savings_year) * df_year
 
         #consumo_desde_genset_hybrid[y] = fuel_consumed_year
         #fuel_savings_by_year[y] = fuel_savings_year
@@ -286,4 +592,32 @@ def simulate_operation(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg: Simulat
     }
 
 
-    return results
\ No newline at end of file
+    return results
+
+def default_anchor_years(N_years, step=5):
+    """Años ancla para fast-forward: 1, 2, step, 2*step, ..., N_years (p. ej. 1, 2, 5, 10, 15, 20)."""
+    return sorted({1, min(2, N_years), N_years} | set(range(step, N_years + 1, step)))
+
+
+def fast_forward_error(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg: SimulationConfig, anchor_years=None):
+    """
+    Compara el modo fast-forward contra la simulación completa.
+    Devuelve (error, full, fast): error contiene la diferencia absoluta y relativa del NPV y,
+    por métrica anual, el máximo error absoluto entre años dividido por el máximo anual de
+    la simulación completa (evita errores relativos enormes en años con valores cercanos a 0).
+    """
+    if anchor_years is None:
+        anchor_years = default_anchor_years(cfg.N_years)
+    full = simulate_operation(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg)
+    fast = simulate_operation(PV_kWp, E_bess_kWh, irr_annual, load_annual, cfg, anchor_years=anchor_years)
+
+    error = {
+        'npv_abs': round(fast['npv'] - full['npv'], 2),
+        'npv_rel': (fast['npv'] - full['npv']) / abs(full['npv']) if full['npv'] else 0.0,
+    }
+    for key in ('fuel_hybrid_by_year', 'consumo_desde_pv', 'consumo_desde_bess', 'consumo_desde_genset',
+                'losses_by_year', 'generación', 'horas_generador_on'):
+        scale = max(abs(v) for v in full[key].values())
+        max_abs = max(abs(fast[key][y] - full[key][y]) for y in full[key])
+        error[key] = max_abs / scale if scale else float(max_abs)
+    return error, full, fast
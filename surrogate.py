@@ -0,0 +1,187 @@
+"""
+Modelo sustituto (surrogate) de NPV, payback y litros de diésel sobre la caja (PV, E).
+
+Se ajusta una interpolación RBF cúbica con cola lineal a partir de un conjunto
+disperso de simulaciones, se estima su error por validación cruzada leave-one-out
+(fórmula de Rippa, sin reajustar el modelo n veces) y se refina agregando
+simulaciones donde el error estimado es mayor. Una vez ajustado, cada consulta
+cuesta microsegundos, lo que permite mover "sliders" de PV y BESS en reuniones
+con clientes; la elección final se puede verificar con una simulación exacta.
+"""
+import numpy as np
+
+from simulator import simulate_operation
+from optimizer import evaluate_grid_point
+from executors import make_executor
+
+
+METRICS = ("npv", "payback_year", "liters")
+
+
+def _evaluate(points, irr_annual, load_annual, cfg, executor):
+    tasks = [(pv, eb, irr_annual, load_annual, cfg) for pv, eb in points]
+    rows = executor.map(evaluate_grid_point, tasks)
+    values = []
+    for r in rows:
+        payback = r[-1]
+        values.append((r[2],
+                       float(cfg.N_years) if payback is None else float(payback),   # sin payback -> horizonte
+                       float(sum(r[6].values()))))
+    return np.array(values, dtype=float)
+
+
+class NPVSurrogate:
+    """
+    Surrogate RBF (phi(r) = r^3 + polinomio lineal) de NPV, payback y litros híbridos
+    totales del horizonte en función de (PV_kWp, E_bess_kWh).
+
+    Payback: los puntos sin recuperación dentro del horizonte se modelan como
+    cfg.N_years, y las predicciones se acotan a [0, N_years].
+    """
+
+    def __init__(self, irr_annual, load_annual, cfg, PV_range=(0, 500), E_range=(0, 500)):
+        self.irr_annual = irr_annual
+        self.load_annual = load_annual
+        self.cfg = cfg
+        self.PV_range = tuple(float(v) for v in PV_range)
+        self.E_range = tuple(float(v) for v in E_range)
+        self._lo = np.array([self.PV_range[0], self.E_range[0]])
+        self._span = np.array([self.PV_range[1] - self.PV_range[0], self.E_range[1] - self.E_range[0]])
+        if np.any(self._span <= 0):
+            raise ValueError("PV_range y E_range deben tener máximo mayor que mínimo")
+        self.points = np.empty((0, 2))     # (PV, E) simulados
+        self.values = np.empty((0, len(METRICS)))
+        self.cv_error = None
+        self.history = []
+
+    # --- Ajuste ---
+
+    def _normalize(self, pts):
+        return (np.asarray(pts, dtype=float) - self._lo) / self._span
+
+    def _fit_rbf(self):
+        X = self._normalize(self.points)
+        n = len(X)
+        r = np.sqrt(((X[:, None, :] - X[None, :, :]) ** 2).sum(axis=2))
+        P = np.hstack([np.ones((n, 1)), X])
+        A = np.zeros((n + 3, n + 3))
+        A[:n, :n] = r ** 3
+        A[:n, n:] = P
+        A[n:, :n] = P.T
+        A_inv = np.linalg.pinv(A)
+        rhs = np.vstack([self.values, np.zeros((3, self.values.shape[1]))])
+        coef = A_inv @ rhs
+        self._X = X
+        self._w = coef[:n]
+        self._poly = coef[n:]
+
+        # Validación cruzada leave-one-out (Rippa): e_k = c_k / (A^-1)_kk
+        loo = coef[:n] / np.diag(A_inv)[:n, None]
+        self._loo = loo
+        value_range = np.ptp(self.values, axis=0)
+        value_range[value_range == 0] = 1.0
+        self.cv_error = {
+            m: {"rmse": float(np.sqrt(np.mean(loo[:, i] ** 2))),
+                "max_abs": float(np.max(np.abs(loo[:, i]))),
+                "max_rel": float(np.max(np.abs(loo[:, i])) / value_range[i])}
+            for i, m in enumerate(METRICS)
+        }
+
+    def _add_samples(self, points, executor):
+        points = np.asarray(points, dtype=float)
+        vals = _evaluate(points, self.irr_annual, self.load_annual, self.cfg, executor)
+        self.points = np.vstack([self.points, points])
+        self.values = np.vstack([self.values, vals])
+        self._fit_rbf()
+        self.history.append({"n_samples": len(self.points),
+                             **{f"{m}_max_rel": self.cv_error[m]["max_rel"] for m in METRICS}})
+
+    def _refinement_points(self, n_new, resolution):
+        # Indicador: distancia al punto simulado más cercano × error LOO relativo de ese punto
+        g = np.linspace(0.0, 1.0, resolution)
+        cand = np.array([(a, b) for a in g for b in g])
+        value_range = np.ptp(self.values, axis=0)
+        value_range[value_range == 0] = 1.0
+        sample_err = np.max(np.abs(self._loo) / value_range, axis=1)
+
+        X = self._X.copy()
+        err = sample_err.copy()
+        chosen = []
+        for _ in range(n_new):
+            d = np.sqrt(((cand[:, None, :] - X[None, :, :]) ** 2).sum(axis=2))
+            nearest = d.argmin(axis=1)
+            score = d[np.arange(len(cand)), nearest] * err[nearest]
+            k = int(score.argmax())
+            if score[k] <= 0:
+                break
+            chosen.append(cand[k])
+            X = np.vstack([X, cand[k]])
+            err = np.append(err, err[nearest[k]])
+        return self._lo + np.array(chosen).reshape(-1, 2) * self._span
+
+    def fit(self, n_initial=25, max_samples=120, tol=0.01, batch_size=8, resolution=41, parallel=True, nprocs=4,
+            executor=None):
+        """
+        Ajusta el surrogate con una malla inicial de ~n_initial puntos y refina por lotes de
+        batch_size simulaciones hasta que el error LOO relativo máximo (respecto al rango de
+        cada métrica) sea <= tol o se alcance max_samples. Devuelve self.cv_error.
+        """
+        executor, own_executor = make_executor(parallel, nprocs, executor)
+        try:
+            side = max(3, int(round(np.sqrt(n_initial))))
+            g = np.linspace(0.0, 1.0, side)
+            initial = self._lo + np.array([(a, b) for a in g for b in g]) * self._span
+            self._add_samples(initial, executor)
+
+            while len(self.points) < max_samples:
+                if max(self.cv_error[m]["max_rel"] for m in METRICS) <= tol:
+                    break
+                n_new = min(batch_size, max_samples - len(self.points))
+                new = self._refinement_points(n_new, resolution)
+                if len(new) == 0:
+                    break
+                self._add_samples(new, executor)
+        finally:
+            if own_executor:
+                executor.close()
+        return self.cv_error
+
+    # --- Consultas ---
+
+    def predict(self, PV_kWp, E_bess_kWh):
+        """Predicción instantánea: dict con 'npv', 'payback_year' y 'liters' (escalares o arreglos)."""
+        if self.cv_error is None:
+            raise RuntimeError("El surrogate no está ajustado; llama a fit() primero")
+        PV = np.asarray(PV_kWp, dtype=float)
+        E = np.asarray(E_bess_kWh, dtype=float)
+        x = (np.stack([PV, E], axis=-1) - self._lo) / self._span
+        flat = x.reshape(-1, 2)
+        r = np.sqrt(((flat[:, None, :] - self._X[None, :, :]) ** 2).sum(axis=2))
+        f = (r ** 3) @ self._w + self._poly[0] + flat @ self._poly[1:]
+        f = f.reshape(PV.shape + (len(METRICS),))
+        out = {m: f[..., i] for i, m in enumerate(METRICS)}
+        out["payback_year"] = np.clip(out["payback_year"], 0.0, float(self.cfg.N_years))
+        if PV.ndim == 0:
+            out = {m: float(v) for m, v in out.items()}
+        return out
+
+    def best(self, resolution=201):
+        """Mejor NPV predicho sobre una malla fina de la caja: (PV, E, predicción)."""
+        pv = np.linspace(self.PV_range[0], self.PV_range[1], resolution)
+        e = np.linspace(self.E_range[0], self.E_range[1], resolution)
+        PV, E = np.meshgrid(pv, e, indexing="ij")
+        pred = self.predict(PV, E)
+        i, j = np.unravel_index(np.argmax(pred["npv"]), PV.shape)
+        return float(pv[i]), float(e[j]), {m: float(v[i, j]) for m, v in pred.items()}
+
+    def verify(self, PV_kWp, E_bess_kWh):
+        """Simulación exacta del punto elegido y error del surrogate en ese punto."""
+        res = simulate_operation(PV_kWp, E_bess_kWh, self.irr_annual, self.load_annual, self.cfg)
+        pred = self.predict(PV_kWp, E_bess_kWh)
+        payback = res['payback_year']
+        exact = {"npv": res['npv'],
+                 "payback_year": float(self.cfg.N_years) if payback is None else float(payback),
+                 "liters": float(sum(res['fuel_hybrid_by_year'].values()))}
+        return {"exact": exact, "predicted": pred,
+                "error": {m: pred[m] - exact[m] for m in METRICS},
+                "result": res}
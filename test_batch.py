@@ -0,0 +1,35 @@
+"""
+simulate_batch frente a simulate_operation: mismos resultados por par (candidato, perfil)
+dentro de la tolerancia de sumar en otro orden.
+
+    python -m pytest -q
+"""
+import numpy as np
+import pytest
+
+from batch import simulate_batch
+from simulator import simulate_operation
+
+
+CANDIDATOS = [(150.0, 456.0), (50.0, 0.0), (0.0, 300.0), (200.0, 100.0)]
+
+
+def test_batch_coincide_con_simulate_operation(perfiles, cfg):
+    irr, load = perfiles(True)
+    PV = np.array([p for p, _ in CANDIDATOS])
+    E = np.array([e for _, e in CANDIDATOS])
+    out = simulate_batch(PV, E, np.tile(irr, (len(PV), 1)), np.tile(load, (len(PV), 1)), cfg)
+
+    for i, (pv, e) in enumerate(CANDIDATOS):
+        ref = simulate_operation(pv, e, irr, load, cfg)
+        assert out["npv"][i] == pytest.approx(ref["npv"], rel=1e-9, abs=0.05)
+        assert out["capex"][i] == ref["capex"]
+        for j, y in enumerate(range(1, cfg.N_years + 1)):
+            assert out["fuel_hybrid"][i, j] == pytest.approx(ref["fuel_hybrid_by_year"][y], abs=0.01)
+            assert out["fuel_genonly"][i, j] == pytest.approx(ref["fuel_genonly_by_year"][y], abs=0.01)
+            assert out["gen_hours"][i, j] == ref["horas_generador_on"][y]
+            assert out["soc_end"][i, j] == pytest.approx(ref["soc_end_by_year"][y], abs=0.01)
+        if ref["payback_year"] is None:
+            assert np.isnan(out["payback_year"][i])
+        else:
+            assert out["payback_year"][i] == pytest.approx(ref["payback_year"], rel=1e-6)
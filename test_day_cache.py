@@ -0,0 +1,35 @@
+"""
+DayCache frente a simulate_operation sin caché.
+
+Con soc_quantum=0 los resultados deben coincidir tras el redondeo a 2 decimales que ya
+aplica simulate_operation; con soc_quantum > 0 la caché debe acertar en los días repetidos.
+
+    python -m pytest -q
+"""
+import pytest
+
+from day_cache import DayCache
+from simulator import simulate_operation
+
+
+CANDIDATOS = [(150.0, 456.0), (50.0, 0.0), (0.0, 300.0), (200.0, 100.0)]
+
+
+@pytest.mark.parametrize("ruido", [False, True])
+@pytest.mark.parametrize("PV, E", CANDIDATOS)
+def test_cache_exacta_coincide(perfiles, cfg, ruido, PV, E):
+    irr, load = perfiles(ruido)
+    ref = simulate_operation(PV, E, irr, load, cfg)
+    cached = simulate_operation(PV, E, irr, load, cfg, day_cache=DayCache(soc_quantum=0))
+    ref.pop("hourly_capture")
+    cached.pop("hourly_capture")
+    assert cached == ref
+
+
+def test_cache_reutiliza_dias_repetidos(perfiles, cfg):
+    irr, load = perfiles(False)
+    cache = DayCache(maxsize=1000)
+    simulate_operation(150.0, 456.0, irr, load, cfg, day_cache=cache)
+    stats = cache.stats()
+    assert stats["hits"] > stats["misses"]
+    assert stats["entries"] <= 1000
@@ -0,0 +1,25 @@
+"""
+Equivalencia entre los modos de simulación sobre un perfil sintético corto.
+
+simulate_operation secuencial es la referencia: el modo especulativo (soc_tol=0) debe dar
+resultados idénticos, también con días distintos entre sí, donde debe reconciliar cada año.
+
+    python -m pytest -q
+"""
+import pytest
+
+from executors import SerialExecutor
+from simulator import simulate_operation
+
+
+CANDIDATOS = [(150.0, 456.0), (50.0, 0.0), (0.0, 300.0), (200.0, 100.0)]
+
+
+@pytest.mark.parametrize("ruido", [False, True])
+@pytest.mark.parametrize("PV, E", CANDIDATOS)
+def test_especulativo_identico(perfiles, cfg, ruido, PV, E):
+    irr, load = perfiles(ruido)
+    ref = simulate_operation(PV, E, irr, load, cfg, capture_day_of_january=30)
+    spec = simulate_operation(PV, E, irr, load, cfg, capture_day_of_january=30,
+                              speculative=True, executor=SerialExecutor())
+    assert spec == ref
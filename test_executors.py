@@ -0,0 +1,73 @@
+"""
+Reintentos de los backends ante workers caídos a mitad de un map.
+
+    python -m pytest -q
+"""
+import os
+import socket
+import time
+import uuid
+
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+
+from executors import ProcessExecutor, SocketExecutor, start_local_workers, stop_local_workers
+
+
+def _doble_lento(x):
+    time.sleep(0.05)
+    return 2 * x
+
+
+def _cae_una_vez(args):
+    # El proceso muere la primera vez que ve x == 3 (la marca es un archivo, compartido entre procesos)
+    x, marca = args
+    if x == 3 and not os.path.exists(marca):
+        open(marca, "w").close()
+        os._exit(1)
+    return 2 * x
+
+
+def _cae_siempre(x):
+    os._exit(1)
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_socket_executor_worker_muere_a_mitad():
+    authkey = uuid.uuid4().hex
+    addresses, procs = start_local_workers(2, authkey, base_port=_puerto_libre())
+    ex = SocketExecutor(addresses, authkey, chunksize=2, retries=1)
+    try:
+        def progress(done, total):
+            # Tras el primer chunk terminado se mata un worker; sus chunks pasan al otro
+            if procs[0].poll() is None:
+                procs[0].kill()
+
+        assert ex.map(_doble_lento, list(range(40)), progress=progress) == [2 * x for x in range(40)]
+        assert procs[0].poll() is not None
+        assert ex.workers == 1
+        # El executor sigue usable con el worker restante
+        assert ex.map(_doble_lento, [1, 2, 3]) == [2, 4, 6]
+    finally:
+        ex.close()
+        stop_local_workers(procs)
+
+
+def test_process_executor_proceso_muere_y_se_reintenta(tmp_path):
+    marca = str(tmp_path / "marca")
+    with ProcessExecutor(2, chunksize=1, retries=1) as ex:
+        assert ex.map(_cae_una_vez, [(x, marca) for x in range(8)]) == [2 * x for x in range(8)]
+        assert os.path.exists(marca)
+
+
+def test_process_executor_sin_reintentos_falla_y_se_recupera():
+    with ProcessExecutor(2, chunksize=1, retries=0) as ex:
+        with pytest.raises(BrokenProcessPool):
+            ex.map(_cae_siempre, [1, 2])
+        # El pool roto se descarta: la siguiente llamada usa uno nuevo
+        assert ex.map(abs, [-1, -2]) == [1, 2]
@@ -0,0 +1,50 @@
+"""
+Igualdad, hash y content_hash de SimulationConfig.
+
+Configuraciones equivalentes (defaults explícitos, factores de más, enteros vs flotantes)
+deben compararse iguales y compartir hash y content_hash, para que las cachés por
+configuración no dupliquen entradas.
+
+    python -m pytest -q
+"""
+import pickle
+
+import numpy as np
+import pytest
+
+from simulator import SimulationConfig
+
+
+def _iguales(a, b):
+    assert a == b
+    assert hash(a) == hash(b)
+    assert a.content_hash == b.content_hash
+
+
+def test_factores_por_defecto_y_explicitos():
+    _iguales(SimulationConfig(N_years=3), SimulationConfig(N_years=3, bess_capacity_factors=[1.0] * 4))
+
+
+def test_factores_se_recortan_a_n_years():
+    _iguales(SimulationConfig(N_years=3, bess_capacity_factors=[1, 0.95, 0.92, 0.9]),
+             SimulationConfig(N_years=3, bess_capacity_factors=[1, 0.95, 0.92, 0.9, 0.88, 0.86]))
+
+
+def test_enteros_flotantes_y_numpy():
+    _iguales(SimulationConfig(N_years=3, DG_power=32, C_diesel_lt=1100),
+             SimulationConfig(N_years=np.int64(3), DG_power=32.0, C_diesel_lt=np.float64(1100)))
+
+
+def test_configuraciones_distintas():
+    a = SimulationConfig(N_years=3)
+    b = SimulationConfig(N_years=3, bess_capacity_factors=[1, 0.95, 0.92, 0.9])
+    assert a != b
+    assert a.content_hash != b.content_hash
+
+
+def test_replace_y_pickle():
+    cfg = SimulationConfig(N_years=3, DG_power=32)
+    assert pickle.loads(pickle.dumps(cfg)) == cfg
+    assert cfg.replace(N_years=5) == SimulationConfig(N_years=5, DG_power=32)
+    with pytest.raises(ValueError):
+        SimulationConfig(N_years=3, bess_capacity_factors=[1, 0.95, 0.92, 0.9]).replace(N_years=5)